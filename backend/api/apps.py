@@ -3,3 +3,16 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import signals  # noqa: F401
+        if settings.DB_HEALTH_CHECKS:
+            from django.core.signals import request_started
+
+            from .connections import check_connections
+            request_started.connect(check_connections)
+        if settings.API_INSTRUMENTATION:
+            from .instrumentation import install
+            install()
@@ -0,0 +1,98 @@
+from hashlib import md5
+from time import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+VERSION_KEY = 'api:version:{}'
+RESPONSE_KEY = 'api:response:{}:{}:{}'
+STATS_KEY = 'api:stats:{}'
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def increment(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def get_version(namespace):
+    cache = get_cache()
+    key = VERSION_KEY.format(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(*namespaces):
+    for namespace in namespaces:
+        increment(VERSION_KEY.format(namespace))
+
+
+def get_stats():
+    cache = get_cache()
+    stats = cache.get_many(
+        [STATS_KEY.format(name) for name in ('hits', 'misses')]
+    )
+    return {
+        name: stats.get(STATS_KEY.format(name), 0)
+        for name in ('hits', 'misses')
+    }
+
+
+def get_response_key(namespace, request):
+    params = sorted(
+        (name, sorted(values))
+        for name, values in request.query_params.lists()
+    )
+    digest = md5(f'{request.path}?{params}'.encode()).hexdigest()
+    return RESPONSE_KEY.format(namespace, get_version(namespace), digest)
+
+
+class CachedResponseMixin:
+    cache_namespace = None
+    cache_actions = ('list', 'retrieve')
+    cache_query_params = None
+
+    def is_cacheable(self, request):
+        if (request.user.is_authenticated
+                or self.action not in self.cache_actions):
+            return False
+        if self.cache_query_params is None:
+            return True
+        return set(request.query_params) <= set(self.cache_query_params)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        key = get_response_key(self.cache_namespace, request)
+        data = cache.get(key)
+        if data is not None:
+            increment(STATS_KEY.format('hits'))
+            return Response(data, headers={'X-Cache': 'HIT'})
+        increment(STATS_KEY.format('misses'))
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
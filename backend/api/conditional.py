@@ -0,0 +1,89 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import get_version
+from .user_state import get_state_namespace
+
+
+def make_etag(*parts):
+    return quote_etag(md5(repr(parts).encode()).hexdigest())
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = {tag[2:] if tag.startswith('W/') else tag
+             for tag in parse_etags(header)}
+    return '*' in etags or etag in etags
+
+
+def patch_conditional_headers(request, response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.API_HTTP_MAX_AGE
+        )
+    patch_vary_headers(response, ('Accept', 'Authorization'))
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    return patch_conditional_headers(
+        request,
+        Response(status=status.HTTP_304_NOT_MODIFIED),
+        etag,
+        last_modified,
+    )
+
+
+class ConditionalGetMixin:
+    etag_namespaces = ()
+    etag_actions = ('list', 'retrieve')
+    etag_user_state = False
+
+    def get_etag(self, request):
+        namespaces = list(self.etag_namespaces)
+        if self.etag_user_state and request.user.is_authenticated:
+            namespaces.append(get_state_namespace(request.user.id))
+        params = sorted(
+            (name, sorted(values))
+            for name, values in request.query_params.lists()
+        )
+        return make_etag(
+            request.path,
+            params,
+            request.accepted_media_type,
+            request.user.id if self.etag_user_state else None,
+            [get_version(namespace) for namespace in namespaces],
+        )
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.etag_actions:
+            return handler(request, *args, **kwargs)
+        etag = self.get_etag(request)
+        if etag_matches(request, etag):
+            return not_modified(request, etag)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            patch_conditional_headers(request, response, etag)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
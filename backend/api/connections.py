@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram import routers
+from foodgram.db_pool import pools
+from .cache import get_cache
+
+PRIMARY_KEY = 'api:primary:{}'
+PRIMARY_COOKIE = 'foodgram_primary'
+
+
+def check_connections(**kwargs):
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+def get_connection_stats():
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        stats[alias] = {
+            'vendor': connection.vendor,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'connected': connection.connection is not None,
+            'replica': alias in settings.DB_REPLICAS,
+        }
+        if alias in pools:
+            stats[alias]['pool'] = pools[alias].stats()
+    return stats
+
+
+def render_connection_stats():
+    lines = ['# TYPE foodgram_db_connected gauge']
+    stats = get_connection_stats()
+    for alias, values in sorted(stats.items()):
+        lines.append(
+            f'foodgram_db_connected{{alias="{alias}"}} '
+            f'{int(values["connected"])}'
+        )
+    for name in ('size', 'in_use', 'idle', 'checkouts', 'waits',
+                 'timeouts', 'discarded'):
+        lines.append(f'# TYPE foodgram_db_pool_{name} gauge')
+        for alias, values in sorted(stats.items()):
+            if 'pool' in values:
+                lines.append(
+                    f'foodgram_db_pool_{name}{{alias="{alias}"}} '
+                    f'{values["pool"][name]}'
+                )
+    return '\n'.join(lines) + '\n'
+
+
+def stick_to_primary(request, response):
+    # Подписанная кука переживает переход запроса в другой процесс, а
+    # ключ в общем кеше нужен клиентам, которые не хранят куки.
+    seconds = settings.DB_REPLICA_STICKY_SECONDS
+    get_cache().set(PRIMARY_KEY.format(request.user.id), True, seconds)
+    response.set_signed_cookie(
+        PRIMARY_COOKIE, request.user.id, salt=PRIMARY_COOKIE,
+        max_age=seconds, httponly=True, samesite='Lax',
+    )
+
+
+def can_read_replica(request):
+    if not settings.DB_REPLICAS or request.method not in SAFE_METHODS:
+        return False
+    if request.user.is_anonymous:
+        return True
+    sticky_user = request.get_signed_cookie(
+        PRIMARY_COOKIE, default=None, salt=PRIMARY_COOKIE,
+        max_age=settings.DB_REPLICA_STICKY_SECONDS,
+    )
+    if sticky_user == str(request.user.id):
+        return False
+    return not get_cache().get(PRIMARY_KEY.format(request.user.id))
+
+
+class ReplicaReadMixin:
+    # Аутентификация и проверка прав идут до переключения, поэтому
+    # только что выданный токен всегда ищется в основной базе.
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        routers.state.replica = can_read_replica(request)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        routers.state.replica = False
+        if (request.method not in SAFE_METHODS and settings.DB_REPLICAS
+                and request.user.is_authenticated):
+            stick_to_primary(request, response)
+        return super().finalize_response(request, response, *args, **kwargs)
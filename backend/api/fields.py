@@ -0,0 +1,33 @@
+import binascii
+from io import BytesIO
+
+from rest_framework import serializers
+
+from recipes.images import get_variant_url, process_image
+
+
+class RecipeImageField(serializers.ImageField):
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            return process_image(super().to_internal_value(data))
+        _, _, encoded = data.rpartition(';base64,')
+        try:
+            decoded = binascii.a2b_base64(encoded)
+        except (binascii.Error, ValueError):
+            raise serializers.ValidationError(
+                'Загрузите корректное изображение'
+            )
+        return process_image(BytesIO(decoded))
+
+    def to_representation(self, image):
+        if not image:
+            return None
+        variant = self.context.get('image_variant')
+        if variant is None:
+            url = image.url
+        else:
+            url = get_variant_url(image, variant)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
@@ -1,14 +1,27 @@
 from django_filters import (ChoiceFilter, FilterSet, ModelChoiceFilter,
                             ModelMultipleChoiceFilter)
-from rest_framework.filters import SearchFilter
+from rest_framework.filters import BaseFilterBackend
 
 from recipes.models import Recipe
 from tags.models import Tag
 from users.models import User
+from .search import search_ingredients, search_recipes
 
 
-class IngredientFilter(SearchFilter):
+class IngredientFilter(BaseFilterBackend):
     search_param = 'name'
+    search = staticmethod(search_ingredients)
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query or view.detail:
+            return queryset
+        return self.search(queryset, query)
+
+
+class RecipeSearchFilter(IngredientFilter):
+    search_param = 'search'
+    search = staticmethod(search_recipes)
 
 
 class RecipeFilter(FilterSet):
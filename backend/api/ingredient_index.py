@@ -0,0 +1,319 @@
+import fcntl
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+from time import monotonic, time
+from uuid import uuid4
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from recipes.models import Recipe, RecipeIngredient
+
+ARRAYS = ('ingredient_ids', 'offsets', 'postings', 'recipe_ids', 'sizes')
+# Изменения после сборки основы: рецепты, которые в основе устарели,
+# и их актуальные связи.
+DELTA_ARRAYS = ('stale', 'changed_ingredients', 'changed_recipes')
+POINTER = 'current'
+
+
+def empty():
+    return np.empty(0, dtype=np.int32)
+
+
+def fetch_links(queryset):
+    links = np.fromiter(
+        (
+            value
+            for link in queryset.values_list(
+                'ingredients_id', 'recipe_id'
+            ).iterator()
+            for value in link
+        ),
+        dtype=np.int32,
+    )
+    return links[0::2], links[1::2]
+
+
+def build_arrays(ingredients, recipes):
+    order = np.lexsort((recipes, ingredients))
+    ingredients, recipes = ingredients[order], recipes[order]
+    ingredient_ids, starts = np.unique(ingredients, return_index=True)
+    recipe_ids, sizes = np.unique(recipes, return_counts=True)
+    return {
+        'ingredient_ids': ingredient_ids,
+        'offsets': np.append(starts, len(recipes)).astype(np.int64),
+        'postings': recipes,
+        'recipe_ids': recipe_ids,
+        'sizes': sizes.astype(np.int32),
+    }
+
+
+def count_links(arrays, recipe_ids):
+    positions = np.searchsorted(arrays['recipe_ids'], recipe_ids)
+    found = positions < len(arrays['recipe_ids'])
+    positions = positions[found]
+    found = arrays['recipe_ids'][positions] == recipe_ids[found]
+    return int(arrays['sizes'][positions[found]].sum())
+
+
+def find(arrays, wanted, stale):
+    present = np.intersect1d(wanted, arrays['ingredient_ids'])
+    positions = np.searchsorted(arrays['ingredient_ids'], present)
+    offsets = arrays['offsets']
+    candidates, matched = np.unique(
+        np.concatenate([empty()] + [
+            arrays['postings'][offsets[position]:offsets[position + 1]]
+            for position in positions
+        ]),
+        return_counts=True,
+    )
+    if len(stale):
+        fresh = ~np.isin(candidates, stale)
+        candidates, matched = candidates[fresh], matched[fresh]
+    sizes = arrays['sizes'][
+        np.searchsorted(arrays['recipe_ids'], candidates)
+    ]
+    return candidates, matched, sizes
+
+
+def match_sql(ingredient_ids):
+    ingredient_ids = list(ingredient_ids)
+    rows = RecipeIngredient.objects.filter(
+        recipe__in=RecipeIngredient.objects.filter(
+            ingredients__in=ingredient_ids,
+        ).values('recipe'),
+    ).values('recipe').annotate(
+        matched=Count('id', filter=Q(ingredients__in=ingredient_ids)),
+        size=Count('id'),
+    ).annotate(
+        coverage=Cast('matched', FloatField()) / Cast('size', FloatField()),
+    ).order_by('-coverage', '-matched', '-recipe_id').values_list(
+        'recipe', 'coverage', 'size', 'matched',
+    )[:settings.RECIPE_MATCH_MAX_RESULTS]
+    if not rows:
+        return empty(), np.empty(0), empty()
+    recipe_ids, coverage, sizes, matched = (
+        np.array(values) for values in zip(*rows)
+    )
+    return recipe_ids, coverage, sizes - matched
+
+
+class IngredientIndex:
+    def __init__(self, path):
+        self.path = path
+        self.lock = Lock()
+        self.generation = None
+        self.index = None
+        self.checked = None
+
+    def read_pointer(self):
+        try:
+            with open(os.path.join(self.path, POINTER)) as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def load(self, generation):
+        directory = os.path.join(self.path, generation)
+        arrays = {
+            name: np.load(
+                os.path.join(directory, f'{name}.npy'), mmap_mode='r'
+            )
+            for name in ARRAYS + DELTA_ARRAYS
+        }
+        with open(os.path.join(directory, 'meta.json')) as file:
+            meta = json.load(file)
+        return arrays, meta
+
+    def get(self):
+        with self.lock:
+            now = monotonic()
+            if (self.checked is None or now - self.checked
+                    >= settings.RECIPE_MATCH_INDEX_CHECK_INTERVAL):
+                self.checked = now
+                generation = self.read_pointer()
+                if generation is None:
+                    # Индекс собирается в фоне, до тех пор подбор
+                    # выполняется запросом к базе.
+                    submit_update()
+                elif generation != self.generation:
+                    arrays, _ = self.load(generation)
+                    self.index = arrays, build_arrays(
+                        arrays['changed_ingredients'],
+                        arrays['changed_recipes'],
+                    ), np.asarray(arrays['stale'])
+                    self.generation = generation
+            return self.index
+
+    def write(self, arrays, meta, base=None):
+        generation = f'{timezone.now():%Y%m%d%H%M%S}-{uuid4().hex[:8]}'
+        directory = os.path.join(self.path, generation)
+        os.makedirs(directory)
+        for name in ARRAYS + DELTA_ARRAYS:
+            path = os.path.join(directory, f'{name}.npy')
+            if base is not None and name in ARRAYS:
+                # Основа не менялась: новое поколение ссылается на те же
+                # файлы, переписывается только дельта.
+                os.link(os.path.join(self.path, base, f'{name}.npy'), path)
+            else:
+                np.save(path, arrays[name])
+        with open(os.path.join(directory, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+        pointer = os.path.join(self.path, f'{POINTER}.{generation}')
+        with open(pointer, 'w') as file:
+            file.write(generation)
+        os.replace(pointer, os.path.join(self.path, POINTER))
+        return generation
+
+    def cleanup(self, current):
+        # Другой процесс мог прочитать старое поколение из указателя и
+        # еще не открыть файлы, поэтому поколение удаляется, только если
+        # его сменили раньше RECIPE_MATCH_INDEX_GRACE секунд назад.
+        deadline = time() - settings.RECIPE_MATCH_INDEX_GRACE
+        generations = sorted(
+            (entry for entry in os.scandir(self.path) if entry.is_dir()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry, successor in zip(generations, generations[1:]):
+            if (entry.name != current
+                    and successor.stat().st_mtime < deadline):
+                shutil.rmtree(entry.path)
+
+    def update(self, full=False, recipe_ids=None):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, 'lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                generation = self.rebuild(full, recipe_ids)
+                self.cleanup(generation)
+                return generation
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def rebuild(self, full, recipe_ids):
+        started = timezone.now()
+        current = self.read_pointer()
+        if full or current is None:
+            arrays = build_arrays(
+                *fetch_links(RecipeIngredient.objects.all())
+            )
+            return self.write(
+                {**arrays, **{name: empty() for name in DELTA_ARRAYS}},
+                {'built_at': started.isoformat(),
+                 'links': len(arrays['postings']), 'changed': 0},
+            )
+        arrays, meta = self.load(current)
+        if recipe_ids is None:
+            recipe_ids = Recipe.objects.filter(
+                updated_at__gte=datetime.fromisoformat(meta['built_at'])
+                - timedelta(seconds=settings.RECIPE_MATCH_INDEX_LAG),
+            ).values_list('id', flat=True)
+        recipe_ids = np.unique(np.fromiter(recipe_ids, dtype=np.int32))
+        if not len(recipe_ids):
+            return current
+        return self.apply(current, arrays, meta, recipe_ids, started)
+
+    def apply(self, current, arrays, meta, recipe_ids, started):
+        kept = ~np.isin(arrays['changed_recipes'], recipe_ids)
+        added_ingredients, added_recipes = fetch_links(
+            RecipeIngredient.objects.filter(recipe__in=recipe_ids.tolist())
+        )
+        delta = {
+            'stale': np.union1d(arrays['stale'], recipe_ids),
+            'changed_ingredients': np.concatenate(
+                (arrays['changed_ingredients'][kept], added_ingredients)
+            ),
+            'changed_recipes': np.concatenate(
+                (arrays['changed_recipes'][kept], added_recipes)
+            ),
+        }
+        base_links = len(arrays['postings'])
+        stale_links = count_links(arrays, delta['stale'])
+        changed = len(delta['changed_recipes'])
+        meta = {
+            'built_at': started.isoformat(),
+            'links': base_links - stale_links + changed,
+            'changed': changed,
+        }
+        if (stale_links + changed
+                <= settings.RECIPE_MATCH_INDEX_DELTA_SHARE * base_links):
+            return self.write(delta, meta, base=current)
+        # Дельта разрослась: она вливается в основу без обращения к базе.
+        ingredients = np.repeat(
+            arrays['ingredient_ids'], np.diff(arrays['offsets'])
+        )
+        recipes = np.asarray(arrays['postings'])
+        kept = ~np.isin(recipes, delta['stale'])
+        arrays = build_arrays(
+            np.concatenate((ingredients[kept],
+                            delta['changed_ingredients'])),
+            np.concatenate((recipes[kept], delta['changed_recipes'])),
+        )
+        return self.write(
+            {**arrays, **{name: empty() for name in DELTA_ARRAYS}},
+            {**meta, 'changed': 0},
+        )
+
+    def match(self, ingredient_ids):
+        index = self.get()
+        if index is None:
+            return match_sql(ingredient_ids)
+        base, changed, stale = index
+        wanted = np.asarray(ingredient_ids, dtype=np.int32)
+        candidates, matched, sizes = (
+            np.concatenate(values) for values in zip(
+                find(base, wanted, stale), find(changed, wanted, empty()),
+            )
+        )
+        coverage = matched / sizes
+        order = np.lexsort((-candidates, -matched, -coverage))
+        return candidates[order], coverage[order], (sizes - matched)[order]
+
+
+ingredient_index = IngredientIndex(settings.RECIPE_MATCH_INDEX_DIR)
+executor = ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix='ingredient-index',
+)
+pending = Lock()
+changes = Lock()
+changed = set()
+
+
+def refresh():
+    # Изменения, пришедшие во время пересборки, запланируют следующую.
+    pending.release()
+    with changes:
+        recipe_ids = set(changed)
+        changed.clear()
+    try:
+        ingredient_index.update(recipe_ids=recipe_ids)
+    except Exception:
+        with changes:
+            changed.update(recipe_ids)
+        raise
+    finally:
+        connection.close()
+
+
+def submit_update():
+    if pending.acquire(blocking=False):
+        executor.submit(refresh)
+
+
+def mark_changed(recipe_id):
+    with changes:
+        changed.add(recipe_id)
+    submit_update()
+
+
+def schedule_update(recipe_id):
+    transaction.on_commit(lambda: mark_changed(recipe_id))
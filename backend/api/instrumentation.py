@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+from operator import itemgetter
+from socket import gethostname
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import serializers
+
+from .cache import get_cache
+
+logger = logging.getLogger('foodgram.instrumentation')
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PLACEHOLDERS = re.compile(r'\((?:%s, )+%s\)')
+WHITESPACE = re.compile(r'\s+')
+METRICS_KEY = 'api:metrics:{}'
+
+state = threading.local()
+
+
+def get_worker():
+    # pid берется при каждом сбросе: после fork у процесса свой слот.
+    return f'{gethostname()}:{os.getpid()}'
+
+
+def fingerprint(sql):
+    return PLACEHOLDERS.sub('(%s, ...)', WHITESPACE.sub(' ', sql)).strip()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializer_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - started
+            self.queries[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.queries.items() if count > 1}
+
+
+class RouteHistograms:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flushing = threading.Lock()
+        self.routes = {}
+        self.slot = None
+        self.flushed = None
+
+    def observe(self, route, method, duration, metrics):
+        with self.lock:
+            stats = self.routes.setdefault((route, method), {
+                'buckets': [0] * len(BUCKETS),
+                'count': 0,
+                'sum': 0,
+                'db_seconds': 0,
+                'serializer_seconds': 0,
+                'queries': 0,
+                'duplicate_queries': 0,
+            })
+            for index, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    stats['buckets'][index] += 1
+            stats['count'] += 1
+            stats['sum'] += duration
+            stats['db_seconds'] += metrics.db_time
+            stats['serializer_seconds'] += metrics.serializer_time
+            stats['queries'] += sum(metrics.queries.values())
+            stats['duplicate_queries'] += sum(
+                count - 1 for count in metrics.duplicates.values()
+            )
+        self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: {**value, 'buckets': list(value['buckets'])}
+                for key, value in self.routes.items()
+            }
+
+    def flush(self, force=False):
+        # Каждый процесс копит счетчики у себя и раз в
+        # API_METRICS_FLUSH_INTERVAL секунд выкладывает их в свой слот
+        # общего кеша, откуда /api/_metrics читает все процессы сразу.
+        if not self.flushing.acquire(blocking=False):
+            return
+        try:
+            now = monotonic()
+            if not force and self.flushed is not None and (
+                now - self.flushed < settings.API_METRICS_FLUSH_INTERVAL
+            ):
+                return
+            self.flushed = now
+            cache = get_cache()
+            worker = get_worker()
+            payload = {'worker': worker, 'routes': self.snapshot()}
+            stored = None
+            if self.slot is not None:
+                stored = cache.get(METRICS_KEY.format(self.slot))
+            if stored is not None and stored['worker'] == worker:
+                cache.set(METRICS_KEY.format(self.slot), payload,
+                          settings.API_METRICS_TIMEOUT)
+            else:
+                self.slot = self.claim(cache, payload)
+        finally:
+            self.flushing.release()
+
+    def claim(self, cache, payload):
+        for slot in range(settings.API_METRICS_MAX_WORKERS):
+            if cache.add(METRICS_KEY.format(slot), payload,
+                         settings.API_METRICS_TIMEOUT):
+                return slot
+        logger.warning('Нет свободного слота для метрик процесса %s',
+                       payload['worker'])
+        return None
+
+    def collect(self):
+        self.flush(force=True)
+        snapshots = get_cache().get_many([
+            METRICS_KEY.format(slot)
+            for slot in range(settings.API_METRICS_MAX_WORKERS)
+        ]).values()
+        return sorted((
+            ((route, method, snapshot['worker']), stats)
+            for snapshot in snapshots
+            for (route, method), stats in snapshot['routes'].items()
+        ), key=itemgetter(0))
+
+    def render(self):
+        routes = self.collect()
+        lines = [
+            '# TYPE foodgram_request_duration_seconds histogram',
+        ]
+        for (route, method, worker), stats in routes:
+            labels = get_labels(route, method, worker)
+            for bound, count in zip(BUCKETS, stats['buckets']):
+                lines.append(
+                    'foodgram_request_duration_seconds_bucket'
+                    f'{{{labels},le="{bound}"}} {count}'
+                )
+            lines.extend((
+                'foodgram_request_duration_seconds_bucket'
+                f'{{{labels},le="+Inf"}} {stats["count"]}',
+                f'foodgram_request_duration_seconds_sum{{{labels}}} '
+                f'{stats["sum"]}',
+                f'foodgram_request_duration_seconds_count{{{labels}}} '
+                f'{stats["count"]}',
+            ))
+        for name in ('db_seconds', 'serializer_seconds', 'queries',
+                     'duplicate_queries'):
+            lines.append(f'# TYPE foodgram_request_{name}_total counter')
+            for (route, method, worker), stats in routes:
+                labels = get_labels(route, method, worker)
+                lines.append(
+                    f'foodgram_request_{name}_total{{{labels}}} {stats[name]}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def get_labels(route, method, worker):
+    return (f'route="{escape(route)}",method="{method}",'
+            f'worker="{escape(worker)}"')
+
+
+histograms = RouteHistograms()
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = state.metrics = RequestMetrics()
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            state.metrics = None
+        duration = perf_counter() - started
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        histograms.observe(route, request.method, duration, metrics)
+        view_time = duration - metrics.db_time - metrics.serializer_time
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{sum(metrics.queries.values())} queries"',
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+            f'view;dur={view_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        logger.info(json.dumps({
+            'route': route,
+            'method': request.method,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'serializer_ms': round(metrics.serializer_time * 1000, 2),
+            'queries': sum(metrics.queries.values()),
+            'duplicates': metrics.duplicates,
+        }, ensure_ascii=False))
+        return response
+
+
+def timed_representation(to_representation):
+    @wraps(to_representation)
+    def wrapper(self, instance):
+        metrics = getattr(state, 'metrics', None)
+        if metrics is None or metrics.serializer_depth:
+            return to_representation(self, instance)
+        metrics.serializer_depth += 1
+        started = perf_counter()
+        try:
+            return to_representation(self, instance)
+        finally:
+            metrics.serializer_time += perf_counter() - started
+            metrics.serializer_depth -= 1
+    return wrapper
+
+
+def install():
+    for serializer_class in (serializers.Serializer,
+                             serializers.ListSerializer):
+        serializer_class.to_representation = timed_representation(
+            serializer_class.to_representation
+        )
@@ -0,0 +1,55 @@
+import random
+from statistics import mean
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Ingredient
+from api.search import search_ingredients
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает поиск ингредиентов с фильтрацией по istartswith'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def measure(self, prefixes, search):
+        timings = []
+        for prefix in prefixes:
+            started = perf_counter()
+            list(search(prefix))
+            timings.append((perf_counter() - started) * 1000)
+        timings.sort()
+        return mean(timings), timings[int(len(timings) * 0.95)]
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            self.stderr.write('Каталог ингредиентов пуст')
+            return
+        generator = random.Random(options['seed'])
+        prefixes = [
+            name[:generator.randint(1, 4)]
+            for name in generator.choices(names, k=options['queries'])
+        ]
+        queryset = Ingredient.objects.all()
+        list(search_ingredients(queryset, prefixes[0], options['limit']))
+        backends = {
+            'istartswith': lambda prefix: queryset.filter(
+                name__istartswith=prefix
+            ),
+            'search': lambda prefix: search_ingredients(
+                queryset, prefix, options['limit']
+            ),
+        }
+        self.stdout.write(
+            f'{len(names)} ингредиентов, {len(prefixes)} запросов'
+        )
+        for label, search in backends.items():
+            average, p95 = self.measure(prefixes, search)
+            self.stdout.write(
+                f'{label}: среднее {average:.2f} мс, p95 {p95:.2f} мс'
+            )
@@ -0,0 +1,96 @@
+import random
+from statistics import mean
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.paginations import LimitPagination
+from api.search import get_recipe_search, search_recipes, tokenize
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет получение первой страницы полнотекстового поиска '
+        'рецептов в сравнении с фильтрацией по icontains'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=100)
+        parser.add_argument('--words', type=int, default=2,
+                            help='Максимум слов в запросе')
+        parser.add_argument('--page-size', type=int,
+                            default=LimitPagination.page_size)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def measure(self, queries, search):
+        timings = []
+        for query in queries:
+            started = perf_counter()
+            search(query)
+            timings.append((perf_counter() - started) * 1000)
+        timings.sort()
+        return (
+            mean(timings),
+            timings[len(timings) // 2],
+            timings[int(len(timings) * 0.95)],
+        )
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+        words = [
+            word
+            for text in (
+                list(Recipe.objects.order_by('?').values_list(
+                    'name', flat=True
+                )[:500])
+                + list(Ingredient.objects.order_by('?').values_list(
+                    'name', flat=True
+                )[:500])
+            )
+            for word in tokenize(text)
+            if len(word) > 2
+        ]
+        if not words:
+            self.stderr.write('Нет рецептов для поиска')
+            return
+        queries = [
+            ' '.join(generator.sample(
+                words, generator.randint(1, options['words'])
+            ))
+            for _ in range(options['queries'])
+        ]
+        page_size = options['page_size']
+        queryset = Recipe.objects.all()
+
+        started = perf_counter()
+        list(search_recipes(queryset, queries[0])[:page_size])
+        self.stdout.write(
+            f'{type(get_recipe_search()).__name__}: первый запрос '
+            f'{(perf_counter() - started) * 1000:.0f} мс'
+        )
+
+        def icontains(query):
+            condition = Q()
+            for word in query.split():
+                condition &= Q(name__icontains=word) | Q(text__icontains=word)
+            return list(
+                queryset.filter(condition).order_by('-id')[:page_size]
+            )
+
+        backends = {
+            'icontains': icontains,
+            'search': lambda query: list(
+                search_recipes(queryset, query)[:page_size]
+            ),
+        }
+        self.stdout.write(
+            f'{queryset.count()} рецептов, {len(queries)} запросов'
+        )
+        for label, search in backends.items():
+            average, p50, p95 = self.measure(queries, search)
+            self.stdout.write(
+                f'{label}: среднее {average:.2f} мс, p50 {p50:.2f} мс, '
+                f'p95 {p95:.2f} мс'
+            )
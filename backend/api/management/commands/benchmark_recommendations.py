@@ -0,0 +1,50 @@
+import resource
+from time import perf_counter
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.recommendations import build_matrix, compute_neighbours
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время и память расчета похожих рецептов на случайных '
+        'данных без записи в БД'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=200000)
+        parser.add_argument('--interactions', type=int, default=5000000)
+        parser.add_argument('--skew', type=float, default=2,
+                            help='Степень перекоса популярности рецептов')
+        parser.add_argument('--neighbours', type=int,
+                            default=settings.RECIPE_NEIGHBOURS)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        generator = np.random.default_rng(options['seed'])
+        size = options['interactions']
+        users = generator.integers(0, options['users'], size)
+        recipes = (
+            options['recipes'] * generator.random(size) ** options['skew']
+        ).astype(np.int64)
+
+        started = perf_counter()
+        recipe_ids, matrix = build_matrix(users, recipes)
+        built = perf_counter()
+        neighbours = sum(
+            len(rows) for rows, _, _ in compute_neighbours(
+                matrix, options['neighbours'], options['chunk_size']
+            )
+        )
+        finished = perf_counter()
+        self.stdout.write(
+            f'{len(recipe_ids)} рецептов, {matrix.nnz} взаимодействий: '
+            f'матрица {built - started:.1f} с, соседи '
+            f'{finished - built:.1f} с ({neighbours}), пик памяти '
+            f'{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024} МБ'
+        )
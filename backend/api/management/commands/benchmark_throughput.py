@@ -0,0 +1,115 @@
+import json
+import threading
+from datetime import datetime
+from itertools import cycle
+from time import perf_counter
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from .run_benchmark import percentile
+
+PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?page=20',
+    '/api/tags/',
+    '/api/ingredients/?name=ин',
+    '/api/users/subscriptions/?recipes_limit=3',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер параллельными запросами и считает '
+        'пропускную способность, чтобы сравнить режимы запуска'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Например, http://localhost:8000')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Длительность замера в секундах')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Путь для нагрузки, можно несколько')
+        parser.add_argument('--token', help='Токен для авторизации')
+        parser.add_argument('--label', default='server')
+        parser.add_argument('--output', default='throughput.json')
+        parser.add_argument('--baseline',
+                            help='Предыдущий отчет для сравнения')
+
+    def worker(self, paths, deadline, results):
+        session = requests.Session()
+        if self.token:
+            session.headers['Authorization'] = f'Token {self.token}'
+        timings, errors = [], 0
+        for path in paths:
+            started = perf_counter()
+            if started >= deadline:
+                break
+            try:
+                response = session.get(self.url + path, timeout=30)
+                if response.status_code >= 400:
+                    errors += 1
+            except requests.RequestException:
+                errors += 1
+            timings.append((perf_counter() - started) * 1000)
+        with self.lock:
+            results['timings'].extend(timings)
+            results['errors'] += errors
+
+    def handle(self, *args, **options):
+        self.url = options['url'].rstrip('/')
+        self.token = options['token']
+        self.lock = threading.Lock()
+        paths = options['paths'] or PATHS
+        results = {'timings': [], 'errors': 0}
+        started = perf_counter()
+        deadline = started + options['duration']
+        threads = [
+            threading.Thread(
+                target=self.worker,
+                args=(cycle(paths[shift:] + paths[:shift]), deadline,
+                      results),
+            )
+            for shift in (
+                number % len(paths)
+                for number in range(options['concurrency'])
+            )
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - started
+        timings = sorted(results['timings'])
+        if not timings:
+            raise CommandError('Сервер не ответил ни на один запрос')
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'label': options['label'],
+            'url': self.url,
+            'concurrency': options['concurrency'],
+            'paths': list(paths),
+            'requests': len(timings),
+            'errors': results['errors'],
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+        }
+        self.stdout.write(
+            f"{report['label']}: {report['rps']} запросов/с, "
+            f"p50 {report['p50_ms']} мс, p95 {report['p95_ms']} мс, "
+            f"p99 {report['p99_ms']} мс, ошибок {report['errors']}"
+        )
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            self.stdout.write(
+                f"{baseline['label']} -> {report['label']}: "
+                f"{baseline['rps']} -> {report['rps']} запросов/с "
+                f"({report['rps'] / max(baseline['rps'], 1e-6):.2f}x), "
+                f"p95 {baseline['p95_ms']} -> {report['p95_ms']} мс"
+            )
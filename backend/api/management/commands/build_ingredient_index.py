@@ -0,0 +1,29 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.ingredient_index import ingredient_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает индекс «ингредиент → рецепты» для подбора рецептов '
+        'по имеющимся продуктам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Собрать заново, а не дополнить. Удаленные рецепты '
+                 'учитываются только при полной сборке',
+        )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        generation = ingredient_index.update(full=options['full'])
+        _, meta = ingredient_index.load(generation)
+        self.stdout.write(
+            f'{generation}: {meta["links"]} связей, из них '
+            f'{meta["changed"]} в дельте, за {perf_counter() - started:.1f} с'
+        )
@@ -0,0 +1,172 @@
+import json
+import random
+from datetime import datetime
+from statistics import mean
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe
+from tags.models import Tag
+from users.models import User
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет основные сценарии API через тестовый клиент и '
+        'сохраняет задержки и число запросов к БД в JSON-отчет'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--users', type=int, default=20,
+                            help='Сколько пользователей участвует в замере')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--baseline',
+                            help='Предыдущий отчет для сравнения')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def get_scenarios(self):
+        tags = list(Tag.objects.values_list('slug', flat=True))
+        names = list(Ingredient.objects.values_list('name', flat=True)[:500])
+        ingredients = list(
+            Ingredient.objects.values_list('id', flat=True)[:50]
+        )
+        generator = self.generator
+        return {
+            'recipes_list': lambda: ('get', '/api/recipes/', None),
+            'recipes_deep_page': lambda: (
+                'get', f'/api/recipes/?page={generator.randint(50, 500)}',
+                None,
+            ),
+            'recipes_by_tags': lambda: (
+                'get', f'/api/recipes/?tags={generator.choice(tags)}', None,
+            ),
+            'recipes_favorited': lambda: (
+                'get', '/api/recipes/?is_favorited=1', None,
+            ),
+            'subscriptions': lambda: (
+                'get', '/api/users/subscriptions/?recipes_limit=3', None,
+            ),
+            'download_shopping_cart': lambda: (
+                'get', '/api/recipes/download_shopping_cart/', None,
+            ),
+            'ingredient_search': lambda: (
+                'get',
+                f'/api/ingredients/?name={generator.choice(names)[:3]}',
+                None,
+            ),
+            'recipe_create': lambda: ('post', '/api/recipes/', {
+                'name': 'benchmark',
+                'text': 'benchmark',
+                'cooking_time': 10,
+                'tags': list(Tag.objects.values_list('id', flat=True)[:1]),
+                'image': IMAGE,
+                'ingredients': [
+                    {'id': pk, 'amount': 10}
+                    for pk in generator.sample(
+                        ingredients, min(5, len(ingredients))
+                    )
+                ],
+            }),
+        }
+
+    def run_scenario(self, build_request, clients, count):
+        timings, queries, statuses = [], [], {}
+        for _ in range(count):
+            method, url, data = build_request()
+            client = self.generator.choice(clients)
+            with CaptureQueriesContext(connection) as context:
+                started = perf_counter()
+                if data is None:
+                    response = getattr(client, method)(url)
+                else:
+                    response = getattr(client, method)(
+                        url, json.dumps(data), content_type='application/json'
+                    )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+            statuses[response.status_code] = (
+                statuses.get(response.status_code, 0) + 1
+            )
+        timings.sort()
+        return {
+            'requests': count,
+            'mean_ms': round(mean(timings), 2),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'queries_mean': round(mean(queries), 2),
+            'queries_max': max(queries),
+            'statuses': statuses,
+        }
+
+    def handle(self, *args, **options):
+        self.generator = random.Random(options['seed'])
+        users = list(User.objects.annotate(
+            cart=Count('shopping_cart'),
+        ).filter(cart__gt=0).order_by('id')[:options['users']])
+        if not users:
+            raise CommandError('Нужна заполненная база: seed_benchmark')
+        clients = []
+        for user in users:
+            token, _ = Token.objects.get_or_create(user=user)
+            clients.append(Client(HTTP_AUTHORIZATION=f'Token {token.key}'))
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'dataset': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'ingredients': Ingredient.objects.count(),
+            },
+            'scenarios': {},
+        }
+        latest = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first()
+        for name, build_request in self.get_scenarios().items():
+            result = self.run_scenario(
+                build_request, clients, options['requests']
+            )
+            report['scenarios'][name] = result
+            self.stdout.write(
+                f"{name}: p50 {result['p50_ms']} мс, "
+                f"p95 {result['p95_ms']} мс, p99 {result['p99_ms']} мс, "
+                f"запросов к БД {result['queries_mean']}"
+            )
+        Recipe.objects.filter(id__gt=latest or 0, name='benchmark').delete()
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            self.compare(report, options['baseline'])
+
+    def compare(self, report, path):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)['scenarios']
+        for name, result in report['scenarios'].items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            self.stdout.write(
+                f"{name}: p95 {before['p95_ms']} -> {result['p95_ms']} мс "
+                f"({result['p95_ms'] / max(before['p95_ms'], 1e-6):.2f}x), "
+                f"запросов {before['queries_mean']} -> "
+                f"{result['queries_mean']}"
+            )
@@ -0,0 +1,224 @@
+import random
+from bisect import bisect
+from itertools import accumulate, islice
+from time import perf_counter
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from api.cache import invalidate
+from recipes import feed, shopping_list
+from recipes.counters import recount
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart)
+from tags.models import Tag
+from users.models import Follow, User
+
+SEARCH_TRIGGERS = (
+    ('recipes_recipe', 'recipes_recipe_search'),
+    ('recipes_recipeingredient', 'recipes_recipeingredient_search_insert'),
+)
+DISHES = ('суп', 'салат', 'пирог', 'каша', 'паста', 'рагу', 'омлет',
+          'запеканка', 'котлеты', 'блины')
+STYLES = ('томатный', 'грибной', 'куриный', 'овощной', 'сырный', 'летний',
+          'острый', 'домашний')
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+class Zipf:
+    def __init__(self, size, exponent, generator):
+        self.generator = generator
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, size + 1)
+        ))
+        self.total = self.cum_weights[-1]
+
+    def sample(self):
+        return bisect(self.cum_weights, self.generator.random() * self.total)
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочных замеров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Подписок на пользователя в среднем')
+        parser.add_argument('--favorites', type=int, default=10,
+                            help='Избранных рецептов на пользователя')
+        parser.add_argument('--carts', type=int, default=3,
+                            help='Рецептов в корзине на пользователя')
+        parser.add_argument('--ingredients-per-recipe', type=int, default=6)
+        parser.add_argument('--zipf', type=float, default=1.1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def bulk_insert(self, model, rows, label):
+        started = perf_counter()
+        total = 0
+        rows = iter(rows)
+        batch = list(islice(rows, self.batch_size))
+        while batch:
+            with transaction.atomic():
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+            batch = list(islice(rows, self.batch_size))
+        elapsed = perf_counter() - started
+        self.stdout.write(
+            f'{label}: {total} строк за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-6):.0f} строк/с)'
+        )
+
+    def toggle_search_triggers(self, enable):
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            for table, trigger in SEARCH_TRIGGERS:
+                cursor.execute(
+                    f'ALTER TABLE {table} '
+                    f'{"ENABLE" if enable else "DISABLE"} TRIGGER {trigger}'
+                )
+
+    def fill_search_vectors(self, first_recipe):
+        if connection.vendor != 'postgresql':
+            return
+        started = perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE recipes_recipe SET search_vector = '
+                'recipes_recipe_build_search_vector(id, name, text) '
+                'WHERE id >= %s',
+                [first_recipe],
+            )
+        self.stdout.write(
+            f'Поисковые векторы: {perf_counter() - started:.1f} с'
+        )
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+    def spread(self, average):
+        return self.generator.randint(0, average * 2)
+
+    def handle(self, *args, **options):
+        self.generator = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color}
+            )
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        if not Ingredient.objects.exists():
+            self.bulk_insert(Ingredient, (
+                Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+                for number in range(2000)
+            ), 'Ингредиенты')
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+
+        first_user = self.next_id(User)
+        user_ids = range(first_user, first_user + options['users'])
+        password = make_password('benchmark')
+        self.bulk_insert(User, (
+            User(
+                id=pk,
+                username=f'bench{pk}',
+                email=f'bench{pk}@example.com',
+                first_name='Bench',
+                last_name=str(pk),
+                password=password,
+            )
+            for pk in user_ids
+        ), 'Пользователи')
+
+        popular_users = Zipf(len(user_ids), options['zipf'], self.generator)
+        first_recipe = self.next_id(Recipe)
+        recipe_ids = range(first_recipe, first_recipe + options['recipes'])
+        # Триггеры поиска пересчитывали бы векторы на каждый пакет вставки,
+        # поэтому векторы заполняются одним запросом после нее.
+        self.toggle_search_triggers(False)
+        try:
+            self.bulk_insert(Recipe, (
+                Recipe(
+                    id=pk,
+                    author_id=user_ids[popular_users.sample()],
+                    name=(
+                        f'{self.generator.choice(STYLES)} '
+                        f'{self.generator.choice(DISHES)} {pk}'
+                    ),
+                    text='Синтетический рецепт для нагрузочных замеров',
+                    image='recipes/images/benchmark.jpg',
+                    cooking_time=self.generator.randint(5, 180),
+                )
+                for pk in recipe_ids
+            ), 'Рецепты')
+            self.bulk_insert(Recipe.tags.through, (
+                Recipe.tags.through(recipe_id=pk, tag_id=tag_id)
+                for pk in recipe_ids
+                for tag_id in self.generator.sample(
+                    tag_ids, self.generator.randint(1, len(tag_ids))
+                )
+            ), 'Теги рецептов')
+            self.bulk_insert(RecipeIngredient, (
+                RecipeIngredient(
+                    recipe_id=pk,
+                    ingredients_id=ingredient_id,
+                    amount=self.generator.randint(1, 500),
+                )
+                for pk in recipe_ids
+                for ingredient_id in self.generator.sample(
+                    ingredient_ids,
+                    min(len(ingredient_ids), self.generator.randint(
+                        1, options['ingredients_per_recipe'] * 2
+                    )),
+                )
+            ), 'Ингредиенты рецептов')
+        finally:
+            self.toggle_search_triggers(True)
+        self.fill_search_vectors(first_recipe)
+
+        self.bulk_insert(Follow, (
+            Follow(user_id=pk, author_id=author_id)
+            for pk in user_ids
+            for author_id in {
+                user_ids[popular_users.sample()]
+                for _ in range(self.spread(options['follows']))
+            } - {pk}
+        ), 'Подписки')
+        popular_recipes = Zipf(
+            len(recipe_ids), options['zipf'], self.generator
+        )
+        for model, average, label in (
+            (Favorite, options['favorites'], 'Избранное'),
+            (ShoppingCart, options['carts'], 'Корзины'),
+        ):
+            self.bulk_insert(model, (
+                model(user_id=pk, recipe_id=recipe_id)
+                for pk in user_ids
+                for recipe_id in {
+                    recipe_ids[popular_recipes.sample()]
+                    for _ in range(self.spread(average))
+                }
+            ), label)
+
+        with connection.cursor() as cursor:
+            for statement in connection.ops.sequence_reset_sql(
+                no_style(), [User, Recipe]
+            ):
+                cursor.execute(statement)
+        with transaction.atomic():
+            recount(apps)
+            shopping_list.rebuild()
+            feed.rebuild()
+        # bulk_create не отправляет post_save: кеш ответов сбрасывается
+        # один раз после заполнения.
+        invalidate('ingredients', 'recipes')
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -1,6 +1,78 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import QuerySet
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+def estimate_count(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        return cursor.fetchone()[0][0]['Plan']['Plan Rows']
 
 
 class LimitPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class KeysetPagination(CursorPagination):
+    ordering = '-id'
+    page_size = LimitPagination.page_size
+    page_size_query_param = LimitPagination.page_size_query_param
+    count_query_param = 'count'
+    count_methods = {
+        'exact': lambda queryset: queryset.count(),
+        'estimate': estimate_count,
+    }
+
+    def get_ordering(self, request, queryset, view):
+        # Курсор идет по порядку самого запроса: поиск сортирует по
+        # релевантности, и '-id' не должен его перебивать.
+        ordering = queryset.query.order_by
+        if ordering and all(isinstance(field, str) for field in ordering):
+            return tuple(ordering)
+        return super().get_ordering(request, queryset, view)
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        count_method = self.count_methods.get(
+            request.query_params.get(self.count_query_param)
+        )
+        self.count = count_method(queryset) if count_method else None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data = OrderedDict(
+                [('count', self.count)] + list(response.data.items())
+            )
+        return response
+
+
+class KeysetLimitPagination(LimitPagination):
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if isinstance(queryset, QuerySet) and (
+            self.keyset_pagination_class.cursor_query_param
+            in request.query_params
+        ):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,140 @@
+import csv
+import json
+from abc import ABCMeta, abstractmethod
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer, metaclass=ABCMeta):
+    filename = 'products'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode()
+
+    @abstractmethod
+    def stream(self, rows):
+        pass
+
+    def get_response(self, rows):
+        content_type = self.media_type
+        if self.charset:
+            content_type = f'{content_type}; charset={self.charset}'
+        response = StreamingHttpResponse(
+            self.stream(rows),
+            content_type=content_type,
+        )
+        attachment = f'attachment; filename="{self.filename}.{self.format}"'
+        response['Content-Disposition'] = attachment
+        return response
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        for row in rows:
+            yield (
+                f"{row['ingredient__name']}\t --"
+                f" {row['amount']}\t"
+                f"({row['ingredient__measurement_unit']})\n"
+            )
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for row in rows:
+            yield writer.writerow((
+                row['ingredient__name'],
+                row['ingredient__measurement_unit'],
+                row['amount'],
+            ))
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, rows):
+        separator = '['
+        for row in rows:
+            yield separator + json.dumps({
+                'name': row['ingredient__name'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+                'amount': row['amount'],
+            }, ensure_ascii=False)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    # PDF нельзя отдавать по строкам: reportlab держит страницы документа
+    # в памяти до save(). Готовый файл пишется во временный файл на диске
+    # и отдается кусками, чтобы ответ не копировал его целиком.
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    margin = 50
+    chunk_size = 64 * 1024
+
+    def stream(self, rows):
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(self.font_name, settings.SHOPPING_LIST_PDF_FONT)
+            )
+        buffer = SpooledTemporaryFile(max_size=self.chunk_size)
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        line_height = self.font_size * 1.5
+        unit = None
+        page_started = False
+        y = 0
+        for row in rows:
+            lines = []
+            if row['ingredient__measurement_unit'] != unit:
+                unit = row['ingredient__measurement_unit']
+                lines.append((self.margin, f'{unit}:'))
+            lines.append((
+                self.margin * 1.5,
+                f"{row['ingredient__name']} — {row['amount']}",
+            ))
+            for x, line in lines:
+                if y - line_height < self.margin:
+                    if page_started:
+                        pdf.showPage()
+                    page_started = True
+                    pdf.setFont(self.font_name, self.font_size)
+                    y = height - self.margin
+                y -= line_height
+                pdf.drawString(x, y, line)
+        pdf.save()
+        with buffer:
+            buffer.seek(0)
+            yield from iter(lambda: buffer.read(self.chunk_size), b'')
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListPDFRenderer,
+)
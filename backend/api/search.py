@@ -0,0 +1,215 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from heapq import nlargest
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+EXACT, PREFIX, SUBSTRING = range(3)
+WORD_START = re.compile(r'\b\w')
+TOKEN = re.compile(r'\w+')
+SEARCH_CONFIG = 'russian'
+# Те же веса, что у ts_rank по умолчанию для категорий A, B и C.
+NAME_WEIGHT, INGREDIENT_WEIGHT, TEXT_WEIGHT = 1.0, 0.4, 0.2
+
+
+class PostgresIngredientSearch:
+    min_trigram_length = 3
+
+    def search(self, queryset, query, limit):
+        if len(query) < self.min_trigram_length:
+            return queryset.filter(
+                name__istartswith=query,
+            ).order_by(Upper('name'))[:limit]
+        return queryset.filter(
+            name__icontains=query,
+        ).annotate(
+            rank=Case(
+                When(name__iexact=query, then=Value(EXACT)),
+                When(name__istartswith=query, then=Value(PREFIX)),
+                default=Value(SUBSTRING),
+                output_field=IntegerField(),
+            ),
+        ).order_by('rank', Upper('name'))[:limit]
+
+
+class PrefixIndexIngredientSearch:
+    def __init__(self):
+        self.lock = Lock()
+        self.indexes = None
+
+    def invalidate(self):
+        with self.lock:
+            self.indexes = None
+
+    def build(self):
+        with self.lock:
+            if self.indexes is None:
+                names, words = [], []
+                for name, pk in Ingredient.objects.values_list('name', 'id'):
+                    name = name.lower()
+                    names.append((name, pk))
+                    words.extend(
+                        (name[match.start():], pk)
+                        for match in WORD_START.finditer(name)
+                        if match.start()
+                    )
+                self.indexes = tuple(
+                    ([key for key, _ in pairs], [pk for _, pk in pairs])
+                    for pairs in (sorted(names), sorted(words))
+                )
+            return self.indexes
+
+    def lookup(self, query, limit):
+        query = query.lower()
+        found = []
+        for keys, ids in self.build():
+            position = bisect_left(keys, query)
+            while (position < len(keys) and len(found) < limit
+                   and keys[position].startswith(query)):
+                if ids[position] not in found:
+                    found.append(ids[position])
+                position += 1
+        return found
+
+    def search(self, queryset, query, limit):
+        found = self.lookup(query, limit)
+        ingredients = queryset.in_bulk(found)
+        return [ingredients[pk] for pk in found if pk in ingredients]
+
+
+class PostgresRecipeSearch:
+    vector = f'{Recipe._meta.db_table}.search_vector'
+
+    def search(self, queryset, query):
+        tsquery = 'plainto_tsquery(%s, %s)'
+        return queryset.extra(
+            where=[f'{self.vector} @@ {tsquery}'],
+            params=[SEARCH_CONFIG, query],
+        ).annotate(
+            # double precision, чтобы позиция курсора из str() точно
+            # совпадала со значением в базе.
+            rank=RawSQL(
+                f'ts_rank({self.vector}, {tsquery})::double precision',
+                (SEARCH_CONFIG, query),
+                output_field=FloatField(),
+            ),
+        ).order_by('-rank', '-id')
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower().replace('ё', 'е'))
+
+
+class RankedResults:
+    def __init__(self, queryset, ids):
+        self.queryset = queryset
+        self.ids = ids
+        if queryset.query.has_filters():
+            allowed = set(
+                queryset.filter(id__in=ids).values_list('id', flat=True)
+            )
+            self.ids = [pk for pk in ids if pk in allowed]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def count(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        objects = self.queryset.order_by().in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
+
+
+class InvertedIndexRecipeSearch:
+    def __init__(self):
+        self.lock = Lock()
+        self.postings = None
+
+    def invalidate(self):
+        with self.lock:
+            self.postings = None
+
+    def build(self):
+        with self.lock:
+            if self.postings is None:
+                postings = defaultdict(dict)
+
+                def add(pk, text, weight):
+                    for token in tokenize(text):
+                        scores = postings[token]
+                        scores[pk] = scores.get(pk, 0) + weight
+
+                for pk, name, text in Recipe.objects.values_list(
+                    'id', 'name', 'text'
+                ).iterator():
+                    add(pk, name, NAME_WEIGHT)
+                    add(pk, text, TEXT_WEIGHT)
+                for pk, name in RecipeIngredient.objects.values_list(
+                    'recipe_id', 'ingredients__name'
+                ).iterator():
+                    add(pk, name, INGREDIENT_WEIGHT)
+                self.postings = dict(postings)
+            return self.postings
+
+    def lookup(self, query, limit):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        postings = self.build()
+        first, *rest = sorted(
+            (postings.get(term, {}) for term in terms), key=len
+        )
+        scores = (
+            (score + sum(scores[pk] for scores in rest), pk)
+            for pk, score in first.items()
+            if all(pk in scores for scores in rest)
+        )
+        return [pk for _, pk in nlargest(limit, scores)]
+
+    def search(self, queryset, query):
+        return RankedResults(
+            queryset,
+            self.lookup(query, settings.RECIPE_SEARCH_MAX_CANDIDATES),
+        )
+
+
+postgres_search = PostgresIngredientSearch()
+prefix_index_search = PrefixIndexIngredientSearch()
+postgres_recipe_search = PostgresRecipeSearch()
+inverted_index_search = InvertedIndexRecipeSearch()
+
+
+def get_ingredient_search():
+    if connection.vendor == 'postgresql':
+        return postgres_search
+    return prefix_index_search
+
+
+def search_ingredients(queryset, query, limit=None):
+    return get_ingredient_search().search(
+        queryset,
+        query,
+        limit or settings.INGREDIENT_SEARCH_LIMIT,
+    )
+
+
+def get_recipe_search():
+    if connection.vendor == 'postgresql':
+        return postgres_recipe_search
+    return inverted_index_search
+
+
+def search_recipes(queryset, query):
+    return get_recipe_search().search(queryset, query)
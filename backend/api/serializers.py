@@ -1,13 +1,17 @@
+from django.conf import settings
 from django.core.validators import ValidationError
-from django.shortcuts import get_object_or_404
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart)
+from recipes import feed, shopping_list
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingListItem)
 from tags.models import Tag
 from users.models import Follow, User
+from .fields import RecipeImageField
+from .user_state import get_user_state
 
 from re import match
 
@@ -32,11 +36,9 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
     def get_is_subscribed(self, author):
-        user = self.context.get('request').user
-        return not user.is_anonymous and Follow.objects.filter(
-            user=user,
-            author=author.id
-        ).exists()
+        return author.id in get_user_state(
+            self.context.get('request')
+        ).following
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -76,6 +78,20 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         )
 
 
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit')
+
+    class Meta:
+        model = ShoppingListItem
+        fields = (
+            'id', 'name',
+            'measurement_unit', 'amount',
+        )
+
+
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source='ingredients.id')
 
@@ -98,7 +114,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     author = UserSerializer(read_only=True)
-    image = Base64ImageField(max_length=None)
+    image = RecipeImageField(max_length=None)
 
     class Meta:
         model = Recipe
@@ -111,20 +127,14 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, recipe):
-        user = self.context.get('request').user
-        if user.is_authenticated and Favorite.objects.filter(user=user,
-                                                             recipe=recipe
-                                                             ).exists():
-            return True
-        return False
+        return recipe.id in get_user_state(
+            self.context.get('request')
+        ).favorites
 
     def get_is_in_shopping_cart(self, recipe):
-        user = self.context.get('request').user
-        if (user.is_authenticated
-            and ShoppingCart.objects.filter(user=user,
-                                            recipe=recipe).exists()):
-            return True
-        return False
+        return recipe.id in get_user_state(
+            self.context.get('request')
+        ).shopping_cart
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -136,7 +146,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         source='ingredients_recipe',
         many=True,
     )
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -163,15 +173,14 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     def validate_ingredients(self, ingredients):
         if not ingredients:
             raise serializers.ValidationError('Добавьте ингридиенты')
-        unique_check = list()
+        ingredient_ids = {
+            ingredient.get('ingredients').get('id')
+            for ingredient in ingredients
+        }
+        existing = Ingredient.objects.filter(id__in=ingredient_ids).count()
+        if not len(ingredients) == len(ingredient_ids) == existing:
+            raise serializers.ValidationError('Проверьте id ингредиентов')
         for ingredient in ingredients:
-            ingredient_id = ingredient.get('ingredients').get('id')
-            if ((ingredient_id not in unique_check)
-                and get_object_or_404(Ingredient,
-                                      id=ingredient_id)):
-                unique_check.append(ingredient_id)
-            else:
-                raise serializers.ValidationError('Проверьте id ингредиентов')
             if ingredient.get('amount') < 0:
                 raise serializers.ValidationError(
                     'Отрицательное значение? Серьезно?'
@@ -188,33 +197,76 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return cooking_time
 
     def create_link_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
                 ingredients_id=ingredient.get('ingredients').get('id'),
                 amount=ingredient.get('amount'),
             )
+            for ingredient in ingredients
+        )
+
+    def update_link_ingredients(self, ingredients, recipe):
+        amounts = {
+            ingredient.get('ingredients').get('id'): ingredient.get('amount')
+            for ingredient in ingredients
+        }
+        removed = []
+        changed = []
+        deltas = {}
+        for link in recipe.ingredients_recipe.all():
+            amount = amounts.pop(link.ingredients_id, None)
+            if amount is None:
+                removed.append(link.id)
+                deltas[link.ingredients_id] = -link.amount
+            elif amount != link.amount:
+                deltas[link.ingredients_id] = amount - link.amount
+                link.amount = amount
+                changed.append(link)
+        if removed:
+            RecipeIngredient.objects.filter(id__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        if amounts:
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredients_id=ingredient_id,
+                    amount=amount,
+                )
+                for ingredient_id, amount in amounts.items()
+            )
+            deltas.update(amounts)
+        shopping_list.change_recipe_ingredients(recipe.id, deltas)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients_recipe')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         self.create_link_ingredients(ingredients, recipe)
         recipe.tags.set(tags)
+        transaction.on_commit(lambda: feed.fan_out(recipe))
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         ingredients = validated_data.pop('ingredients_recipe')
         tags = validated_data.pop('tags')
         recipe = super().update(recipe, validated_data)
-        recipe.ingredients.clear()
-        self.create_link_ingredients(ingredients, recipe)
+        self.update_link_ingredients(ingredients, recipe)
         recipe.tags.set(tags)
         return recipe
 
+    def to_representation(self, recipe):
+        prefetch_related_objects(
+            [recipe], 'ingredients_recipe__ingredients', 'tags'
+        )
+        return super().to_representation(recipe)
+
 
 class TargetSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -224,9 +276,33 @@ class TargetSerializer(serializers.ModelSerializer):
         )
 
 
+class RecipeMatchSerializer(TargetSerializer):
+    coverage = serializers.SerializerMethodField()
+    missing = serializers.SerializerMethodField()
+
+    class Meta(TargetSerializer.Meta):
+        fields = TargetSerializer.Meta.fields + ('coverage', 'missing')
+
+    def get_coverage(self, recipe):
+        return round(self.context['coverage'][recipe.id], 3)
+
+    def get_missing(self, recipe):
+        return IngredientSerializer(
+            self.context['missing'].get(recipe.id, ()), many=True
+        ).data
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPE_BATCH_MAX_SIZE,
+    )
+
+
 class FollowSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -241,21 +317,21 @@ class FollowSerializer(serializers.ModelSerializer):
                 fields=('user', 'author'))
         ]
 
-    def get_recipes_count(self, author):
-        return author.recipes.count()
-
     def get_recipes(self, author):
-        recipes = author.recipes.all()
-        recipes_limit = self.context.get('request').query_params.get(
-            'recipes_limit',
-        )
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
-        return TargetSerializer(recipes, many=True).data
+        if hasattr(author, 'preview_recipes'):
+            recipes = author.preview_recipes
+        else:
+            recipes = author.recipes.all()[:self.context.get('recipes_limit')]
+        return TargetSerializer(
+            recipes,
+            many=True,
+            context={
+                'request': self.context.get('request'),
+                'image_variant': settings.RECIPE_IMAGE_LIST_VARIANT,
+            },
+        ).data
 
     def get_is_subscribed(self, author):
-        user = self.context.get('request').user
-        return not user.is_anonymous and Follow.objects.filter(
-            user=user,
-            author=author.id
-        ).exists()
+        return author.id in get_user_state(
+            self.context.get('request')
+        ).following
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart)
+from tags.models import Tag
+from users.models import Follow, User
+from .cache import invalidate
+from .ingredient_index import schedule_update
+from .search import inverted_index_search, prefix_index_search
+from .user_state import invalidate_user_state
+
+CACHE_NAMESPACES = {
+    Ingredient: ('ingredients', 'recipes'),
+    Recipe: ('recipes',),
+    RecipeIngredient: ('recipes',),
+    Tag: ('tags', 'recipes'),
+    User: ('recipes',),
+}
+USER_STATE_MODELS = (Favorite, ShoppingCart, Follow)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    prefix_index_search.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def invalidate_recipe_index(**kwargs):
+    transaction.on_commit(inverted_index_search.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def update_ingredient_index(sender, instance, **kwargs):
+    schedule_update(instance.id if sender is Recipe else instance.recipe_id)
+
+
+# Версии меняем после коммита, иначе параллельный запрос успеет
+# закешировать старые данные под новой версией.
+@receiver((post_save, post_delete))
+def invalidate_response_cache(sender, update_fields=None, **kwargs):
+    if sender not in CACHE_NAMESPACES:
+        return
+    if sender is User and update_fields == frozenset(('last_login',)):
+        return
+    transaction.on_commit(lambda: invalidate(*CACHE_NAMESPACES[sender]))
+
+
+@receiver((post_save, post_delete))
+def invalidate_viewer_state(sender, instance, **kwargs):
+    if sender in USER_STATE_MODELS:
+        transaction.on_commit(
+            lambda: invalidate_user_state(instance.user_id)
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(lambda: invalidate('recipes'))
@@ -1,8 +1,8 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (IngredientViewSet, RecipeViewSet, SubscriptionListView,
-                    TagViewSet, UserViewSet)
+from .views import (IngredientViewSet, MetricsView, RecipeViewSet,
+                    SubscriptionListView, TagViewSet, UserViewSet)
 
 router = routers.DefaultRouter()
 
@@ -13,6 +13,7 @@ router.register(r'users', UserViewSet, basename="users")
 
 urlpatterns = [
     path('users/subscriptions/', SubscriptionListView.as_view()),
+    path('_metrics', MetricsView.as_view()),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
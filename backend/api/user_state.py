@@ -0,0 +1,70 @@
+from django.conf import settings
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+from .cache import get_cache, get_version, invalidate
+
+STATE_KEY = 'api:user-state:{}:{}:{}'
+SOURCES = {
+    'favorites': (Favorite, 'user', 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'user', 'recipe_id'),
+    'following': (Follow, 'user', 'author_id'),
+}
+
+
+class UserState:
+    def __init__(self, user):
+        self.user = user
+        self.loaded = {}
+        self.version = None
+
+    def get(self, kind):
+        if kind not in self.loaded:
+            self.loaded[kind] = self.load(kind)
+        return self.loaded[kind]
+
+    def load(self, kind):
+        if self.user.is_anonymous:
+            return frozenset()
+        # Версия читается до запроса к базе: если между запросом и
+        # записью в кеш состояние изменится, устаревший набор ляжет под
+        # старой версией и больше не будет прочитан.
+        if self.version is None:
+            self.version = get_version(get_state_namespace(self.user.id))
+        cache = get_cache()
+        key = STATE_KEY.format(self.user.id, self.version, kind)
+        ids = cache.get(key)
+        if ids is None:
+            model, lookup, field = SOURCES[kind]
+            ids = frozenset(model.objects.filter(
+                **{lookup: self.user}
+            ).values_list(field, flat=True))
+            cache.set(key, ids, settings.USER_STATE_CACHE_TIMEOUT)
+        return ids
+
+    @property
+    def favorites(self):
+        return self.get('favorites')
+
+    @property
+    def shopping_cart(self):
+        return self.get('shopping_cart')
+
+    @property
+    def following(self):
+        return self.get('following')
+
+
+def get_user_state(request):
+    state = getattr(request, 'user_state', None)
+    if state is None or state.user != request.user:
+        state = request.user_state = UserState(request.user)
+    return state
+
+
+def get_state_namespace(user_id):
+    return f'user-state:{user_id}'
+
+
+def invalidate_user_state(user_id):
+    invalidate(get_state_namespace(user_id))
@@ -1,74 +1,129 @@
-from django.db.models import Sum
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Prefetch, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (SAFE_METHODS, AllowAny, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 
+from recipes import batch, feed, recommendations
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart)
+                            ShoppingCart, ShoppingListItem)
 from tags.models import Tag
-from users.models import Follow, User
-from .filters import IngredientFilter, RecipeFilter
-from .paginations import LimitPagination
+from users import follows
+from users.models import User
+from .cache import CachedResponseMixin
+from .connections import ReplicaReadMixin, render_connection_stats
+from .conditional import (ConditionalGetMixin, etag_matches, make_etag,
+                          not_modified, patch_conditional_headers)
+from .filters import IngredientFilter, RecipeFilter, RecipeSearchFilter
+from .ingredient_index import ingredient_index
+from .instrumentation import histograms
+from .paginations import KeysetLimitPagination, LimitPagination
 from .permissions import IsAuthor, IsReadOnly
+from .renderers import SHOPPING_LIST_RENDERERS
+from .search import RankedResults
 from .serializers import (FollowSerializer, IngredientSerializer,
-                          RecipeCreateSerializer, RecipeSerializer,
-                          TagSerializer, TargetSerializer, UserSerializer)
+                          RecipeBatchSerializer, RecipeCreateSerializer,
+                          RecipeMatchSerializer, RecipeSerializer,
+                          ShoppingListItemSerializer, TagSerializer,
+                          TargetSerializer, UserSerializer)
+from .user_state import invalidate_user_state
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                 CachedResponseMixin, viewsets.ModelViewSet):
+    cache_namespace = 'tags'
+    etag_namespaces = ('tags',)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AllowAny]
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                        CachedResponseMixin, viewsets.ModelViewSet):
+    cache_namespace = 'ingredients'
+    etag_namespaces = ('ingredients',)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (IngredientFilter,)
     permission_classes = [AllowAny]
-    search_fields = ('^name',)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                    CachedResponseMixin, viewsets.ModelViewSet):
+    cache_namespace = 'recipes'
+    cache_actions = ('list',)
+    cache_query_params = ('page', 'limit')
+    etag_namespaces = ('recipes',)
+    etag_user_state = True
     queryset = Recipe.objects.order_by('-id')
     permission_classes = (IsReadOnly | IsAuthor,)
-    pagination_class = LimitPagination
-    filter_backends = [DjangoFilterBackend]
+    pagination_class = KeysetLimitPagination
+    filter_backends = [DjangoFilterBackend, RecipeSearchFilter]
     filter_class = RecipeFilter
     lookup_field = 'id'
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            'author',
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredients_recipe',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredients'
+                ),
+            ),
+        )
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeSerializer
         return RecipeCreateSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'feed', 'recommended', 'trending'):
+            context['image_variant'] = settings.RECIPE_IMAGE_LIST_VARIANT
+        return context
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def change_items(self, request, recipe_ids, obj):
+        with transaction.atomic():
+            if request.method == 'POST':
+                changed = batch.add(obj, request.user, recipe_ids)
+            else:
+                changed = batch.remove(obj, request.user, recipe_ids)
+            if changed:
+                transaction.on_commit(
+                    lambda: invalidate_user_state(request.user.id)
+                )
+        return changed
+
     def processing_item(self, request, id, obj):
-        item = obj.objects.filter(
-            user=request.user,
-            recipe__id=id,
-        )
         msg = ('Только POST запрос на существующий,',
                'DELETE на несуществующий рецепт')
-        if (request.method == 'POST') and (not item.exists()):
-            recipe = get_object_or_404(
-                Recipe,
-                id=id,
-            )
-            obj.objects.create(
-                user=request.user,
-                recipe=recipe,
-            )
-            serializer = TargetSerializer(recipe)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        elif (request.method == 'DELETE') and (item.exists()):
-            item.delete()
+        if request.method == 'POST':
+            recipe = get_object_or_404(Recipe, id=id)
+            if self.change_items(request, [recipe.id], obj):
+                serializer = TargetSerializer(recipe)
+                return Response(serializer.data,
+                                status=status.HTTP_201_CREATED)
+        elif self.change_items(request, [int(id)], obj):
             msg = 'Удалено'
             return Response(
                 {'Confirmation': msg},
@@ -105,29 +160,169 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
         return response
 
+    def processing_items(self, request, obj):
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        changed = found = self.change_items(request, recipe_ids, obj)
+        if request.method == 'POST':
+            statuses = ('created', 'exists', 'not_found')
+            missing = [pk for pk in recipe_ids if pk not in changed]
+            if missing:
+                found = changed | set(Recipe.objects.filter(
+                    id__in=missing,
+                ).values_list('id', flat=True))
+        else:
+            statuses = ('deleted', None, 'not_found')
+        return Response({'results': [
+            {
+                'id': recipe_id,
+                'status': statuses[
+                    0 if recipe_id in changed else
+                    1 if recipe_id in found else 2
+                ],
+            }
+            for recipe_id in recipe_ids
+        ]})
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+        url_name='favorite-batch',
+    )
+    def favorite_batch(self, request):
+        return self.processing_items(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+    )
+    def shopping_cart_batch(self, request):
+        return self.processing_items(request, ShoppingCart)
+
+    def get_match_ingredients(self):
+        values = ','.join(self.request.query_params.getlist('ingredients'))
+        try:
+            ingredient_ids = {int(value) for value in values.split(',')}
+        except ValueError:
+            raise ValidationError({'ingredients': 'Укажите id ингредиентов'})
+        return ingredient_ids
+
+    @action(detail=False, methods=['GET'])
+    def match(self, request):
+        ingredient_ids = self.get_match_ingredients()
+        recipe_ids, coverage, _ = ingredient_index.match(list(ingredient_ids))
+        limit = settings.RECIPE_MATCH_MAX_RESULTS
+        recipe_ids = recipe_ids[:limit].tolist()
+        queryset = DjangoFilterBackend().filter_queryset(
+            request, Recipe.objects.prefetch_related('tags'), self
+        )
+        page = self.paginate_queryset(RankedResults(queryset, recipe_ids))
+        missing = {}
+        for link in RecipeIngredient.objects.filter(
+            recipe__in=[recipe.id for recipe in page],
+        ).exclude(
+            ingredients__in=ingredient_ids,
+        ).select_related('ingredients').order_by('ingredients__name'):
+            missing.setdefault(link.recipe_id, []).append(link.ingredients)
+        serializer = RecipeMatchSerializer(page, many=True, context={
+            'request': request,
+            'image_variant': settings.RECIPE_IMAGE_LIST_VARIANT,
+            'coverage': dict(zip(recipe_ids, coverage[:limit].tolist())),
+            'missing': missing,
+        })
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=['GET'],
             permission_classes=[IsAuthenticated])
-    def download_shopping_cart(self, request):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredients__name',
-            'ingredients__measurement_unit'
-        ).annotate(total_amount=Sum('amount'))
-        products = [
-            (
-                f"{ingredient['ingredients__name']}\t --"
-                f" {ingredient['total_amount']}\t"
-                f"({ingredient['ingredients__measurement_unit']})\n"
+    def feed(self, request):
+        before = request.query_params.get('before')
+        if before is None:
+            feed.trim(request.user)
+        else:
+            try:
+                before = int(before)
+            except ValueError:
+                raise ValidationError({'before': 'Укажите id рецепта'})
+        limit = self.paginator.get_page_size(request)
+        ids = feed.get_page(request.user, before, limit)
+        recipes = self.get_queryset().order_by().in_bulk(ids[:limit])
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids[:limit] if pk in recipes], many=True
+        )
+        next_link = None
+        if len(ids) > limit:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), 'before', ids[limit - 1]
             )
-            for ingredient in ingredients]
-        response = HttpResponse(products, content_type='text/plain')
-        attachment = 'attachment; filename="products.txt"'
-        response['Content-Disposition'] = attachment
-        return response
+        return Response(OrderedDict([
+            ('next', next_link),
+            ('results', serializer.data),
+        ]))
+
+    @action(detail=False, methods=['GET'],
+            permission_classes=[IsAuthenticated])
+    def recommended(self, request):
+        limit = self.paginator.get_page_size(request)
+        ids = list(recommendations.recommend(request.user).values_list(
+            'neighbour', flat=True
+        )[:limit])
+        recipes = self.get_queryset().order_by().in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['GET'])
+    def trending(self, request):
+        queryset = DjangoFilterBackend().filter_queryset(
+            request,
+            self.get_queryset().filter(
+                trending__isnull=False,
+            ).order_by('-trending__score', '-id'),
+            self,
+        )
+        paginator = LimitPagination()
+        page = paginator.paginate_queryset(queryset, request, self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
+    def get_shopping_list(self):
+        return ShoppingListItem.objects.filter(
+            user=self.request.user,
+            amount__gt=0,
+        ).order_by(
+            'ingredient__measurement_unit',
+            'ingredient__name',
+        )
 
-class UserViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['GET'],
+            permission_classes=[IsAuthenticated],
+            renderer_classes=SHOPPING_LIST_RENDERERS)
+    def download_shopping_cart(self, request):
+        ingredients = self.get_shopping_list().values(
+            'ingredient__measurement_unit',
+            'ingredient__name',
+            'amount',
+        )
+        return request.accepted_renderer.get_response(ingredients.iterator())
+
+    @action(detail=False, methods=['GET'],
+            permission_classes=[IsAuthenticated])
+    def shopping_list(self, request):
+        serializer = ShoppingListItemSerializer(
+            self.get_shopping_list().select_related('ingredient'),
+            many=True,
+        )
+        return Response(serializer.data)
+
+
+class UserViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
@@ -136,10 +331,16 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['GET'],
             permission_classes=[IsAuthenticated])
     def me(self, request):
+        user = request.user
+        etag = make_etag(user.id, user.updated_at)
+        if etag_matches(request, etag):
+            return not_modified(request, etag, user.updated_at)
         data = UserSerializer(
             self.request.user,
             context={'request': request}).data
-        return Response(data)
+        return patch_conditional_headers(
+            request, Response(data), etag, user.updated_at
+        )
 
     @action(detail=True, methods=['POST', 'DELETE'],
             permission_classes=[IsAuthenticated])
@@ -147,27 +348,106 @@ class UserViewSet(viewsets.ModelViewSet):
         author = get_object_or_404(User, id=id)
         user = request.user
         if request.method == 'POST':
-            if Follow.objects.filter(user=user, author=author).exists():
-                return Response({"errors": "Вы уже подписаны на этого автора"},
-                                status=status.HTTP_400_BAD_REQUEST)
-            elif author == user:
+            if author == user:
                 return Response({"errors": "Нельзя подписываться на себя"},
                                 status=status.HTTP_400_BAD_REQUEST)
-
-            Follow.objects.create(user=user, author=author)
+            with transaction.atomic():
+                if not follows.follow(user, author):
+                    return Response(
+                        {"errors": "Вы уже подписаны на этого автора"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                feed.backfill(user, author)
+                transaction.on_commit(
+                    lambda: invalidate_user_state(user.id)
+                )
             data = UserSerializer(
                 author,
                 context={'request': request}).data
             return Response(data, status=status.HTTP_201_CREATED)
 
-        Follow.objects.get(user=user, author=author).delete()
+        with transaction.atomic():
+            if not follows.unfollow(user, author):
+                return Response({"errors": "Вы не подписаны на этого автора"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            feed.remove_author(user, author)
+            feed.backfill_followers(author)
+            transaction.on_commit(
+                lambda: invalidate_user_state(user.id)
+            )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class SubscriptionListView(generics.ListAPIView):
+class SubscriptionListView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = FollowSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = LimitPagination
+    pagination_class = KeysetLimitPagination
+
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if not recipes_limit:
+            return None
+        try:
+            recipes_limit = int(recipes_limit)
+            if recipes_limit < 0:
+                raise ValueError
+        except ValueError:
+            raise ValidationError(
+                {'recipes_limit': 'Укажите неотрицательное целое число'}
+            )
+        return recipes_limit
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['recipes_limit'] = self.get_recipes_limit()
+        return context
+
+    def get_preview_recipes(self, author_ids):
+        recipes = Recipe.objects.order_by('name', 'id')
+        recipes_limit = self.get_recipes_limit()
+        if recipes_limit is not None:
+            # Нумеруются рецепты только авторов текущей страницы. Django 2.2
+            # не фильтрует по оконным функциям, поэтому внешний отбор
+            # написан на SQL.
+            ranked = Recipe.objects.filter(
+                author__in=author_ids,
+            ).annotate(row_number=Window(
+                RowNumber(),
+                partition_by=[F('author')],
+                order_by=[F('name').asc(), F('id').asc()],
+            )).values('id', 'row_number')
+            sql, params = ranked.query.sql_with_params()
+            recipes = recipes.extra(
+                where=[f'{Recipe._meta.db_table}.id IN (SELECT id FROM '
+                       f'({sql}) ranked WHERE row_number <= %s)'],
+                params=(*params, recipes_limit),
+            )
+        return recipes.prefetch_related('tags')
 
     def get_queryset(self):
         return User.objects.filter(following__user=self.request.user)
+
+    def paginate_queryset(self, queryset):
+        authors = super().paginate_queryset(queryset)
+        if authors:
+            prefetch_related_objects(authors, Prefetch(
+                'recipes',
+                queryset=self.get_preview_recipes(
+                    [author.id for author in authors]
+                ),
+                to_attr='preview_recipes',
+            ))
+        return authors
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        metrics = render_connection_stats()
+        if settings.API_INSTRUMENTATION:
+            metrics = histograms.render() + metrics
+        return HttpResponse(
+            metrics,
+            content_type='text/plain; version=0.0.4',
+        )
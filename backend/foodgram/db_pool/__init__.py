@@ -0,0 +1,3 @@
+# Пулы соединений процесса по псевдонимам баз; заполняются бэкендом
+# foodgram.db_pool при первом подключении.
+pools = {}
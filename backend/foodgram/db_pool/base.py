@@ -0,0 +1,135 @@
+import threading
+from collections import deque
+
+import psycopg2
+from django.db.backends.postgresql import base
+from django.db.utils import OperationalError
+from psycopg2 import extensions
+
+from . import pools
+
+pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    def __init__(self, alias, size, timeout, health_checks, conn_params):
+        self.alias = alias
+        self.size = size
+        self.timeout = timeout
+        self.health_checks = health_checks
+        self.conn_params = conn_params
+        self.idle = deque()
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.discarded = 0
+
+    def acquire(self):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.waits += 1
+            if not self.slots.acquire(timeout=self.timeout):
+                with self.lock:
+                    self.timeouts += 1
+                raise OperationalError(
+                    f'Пул соединений {self.alias} исчерпан'
+                )
+        try:
+            connection = self.checkout()
+        except Exception:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.in_use += 1
+            self.checkouts += 1
+        return connection
+
+    def connect(self):
+        # psycopg2.pool с minconn=0 закрывает каждое возвращенное
+        # соединение, поэтому свободные соединения храним сами.
+        try:
+            return self.idle.pop()
+        except IndexError:
+            return psycopg2.connect(**self.conn_params)
+
+    def checkout(self):
+        connection = self.connect()
+        if not self.health_checks:
+            return connection
+        try:
+            # Без autocommit проверка открыла бы транзакцию, и Django не
+            # смог бы включить autocommit при подключении.
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return connection
+        except Exception:
+            connection.close()
+            with self.lock:
+                self.discarded += 1
+            return psycopg2.connect(**self.conn_params)
+
+    def release(self, connection):
+        try:
+            if not connection.closed and (
+                connection.get_transaction_status()
+                != extensions.TRANSACTION_STATUS_IDLE
+            ):
+                try:
+                    connection.rollback()
+                except psycopg2.Error:
+                    connection.close()
+            if not connection.closed:
+                self.idle.append(connection)
+        finally:
+            with self.lock:
+                self.in_use -= 1
+            self.slots.release()
+
+    def close(self):
+        while self.idle:
+            self.idle.pop().close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'discarded': self.discarded,
+            }
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_pool(self, conn_params):
+        with pools_lock:
+            if self.alias not in pools:
+                pools[self.alias] = ConnectionPool(
+                    self.alias,
+                    self.settings_dict.get('POOL_SIZE', 10),
+                    self.settings_dict.get('POOL_TIMEOUT', 5),
+                    self.settings_dict.get('HEALTH_CHECKS', False),
+                    conn_params,
+                )
+            return pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool(conn_params).acquire()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                pools[self.alias].release(self.connection)
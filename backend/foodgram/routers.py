@@ -0,0 +1,22 @@
+import random
+import threading
+
+from django.conf import settings
+
+state = threading.local()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(state, 'replica', False) and settings.DB_REPLICAS:
+            return random.choice(settings.DB_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -1,6 +1,7 @@
 import os
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,9 +25,9 @@ INSTALLED_APPS = [
     'rest_framework',
     'django_filters',
     'djoser',
-    'api',
-    'users',
-    'recipes',
+    'api.apps.ApiConfig',
+    'users.apps.UsersConfig',
+    'recipes.apps.RecipesConfig',
     'tags',
 ]
 
@@ -40,6 +41,27 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+API_INSTRUMENTATION = os.getenv('API_INSTRUMENTATION', 'False') == 'True'
+API_METRICS_FLUSH_INTERVAL = 10
+API_METRICS_TIMEOUT = 24 * 60 * 60
+API_METRICS_MAX_WORKERS = 64
+
+if API_INSTRUMENTATION:
+    MIDDLEWARE.insert(0, 'api.instrumentation.InstrumentationMiddleware')
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'console': {'class': 'logging.StreamHandler'},
+        },
+        'loggers': {
+            'foodgram.instrumentation': {
+                'handlers': ['console'],
+                'level': 'INFO',
+            },
+        },
+    }
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
@@ -60,6 +82,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+DB_HEALTH_CHECKS = os.getenv('DB_HEALTH_CHECKS', 'False') == 'True'
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE'),
@@ -68,8 +93,68 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
+        'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 10)),
+        'POOL_TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+        'HEALTH_CHECKS': DB_HEALTH_CHECKS,
     }
 }
+if DB_POOL and DATABASES['default']['ENGINE'] in (
+    'django.db.backends.postgresql', 'django.db.backends.postgresql_psycopg2'
+):
+    DATABASES['default']['ENGINE'] = 'foodgram.db_pool'
+
+# Реплика для чтений из API: DB_REPLICA_HOST для PostgreSQL или
+# DB_REPLICA_NAME, например, для второго файла SQLite при локальной проверке.
+DB_REPLICAS = []
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DB_REPLICAS.append('replica')
+DATABASE_ROUTERS = ['foodgram.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает только из основной базы.
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+
+# Версии кеша, ETag, множества зрителя и привязка к основной базе должны
+# быть общими для всех процессов, поэтому LocMemCache включается только
+# явно и только для одного процесса.
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+API_LOCAL_CACHE = os.getenv('API_LOCAL_CACHE', 'False') == 'True'
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+elif WEB_CONCURRENCY > 1:
+    raise ImproperlyConfigured(
+        'Для нескольких процессов (WEB_CONCURRENCY > 1) нужен REDIS_URL'
+    )
+elif API_LOCAL_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        'Задайте REDIS_URL или API_LOCAL_CACHE=True для запуска в одном '
+        'процессе'
+    )
+
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 60 * 60))
+USER_STATE_CACHE_TIMEOUT = int(
+    os.getenv('USER_STATE_CACHE_TIMEOUT', 60 * 60)
+)
+API_HTTP_MAX_AGE = int(os.getenv('API_HTTP_MAX_AGE', 5))
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -99,6 +184,15 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+RECIPE_IMAGE_MAX_SIZE = 1600
+RECIPE_IMAGE_QUALITY = 85
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (480, 480),
+}
+RECIPE_IMAGE_LIST_VARIANT = 'thumbnail'
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+
 AUTH_USER_MODEL = 'users.User'
 
 SIMPLE_JWT = {
@@ -119,6 +213,41 @@ REST_FRAMEWORK = {
     ]
 }
 
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+RECIPE_SEARCH_MAX_CANDIDATES = int(
+    os.getenv('RECIPE_SEARCH_MAX_CANDIDATES', 1000)
+)
+
+RECIPE_MATCH_INDEX_DIR = os.getenv(
+    'RECIPE_MATCH_INDEX_DIR', os.path.join(BASE_DIR, 'indexes', 'ingredients')
+)
+RECIPE_MATCH_INDEX_CHECK_INTERVAL = 5
+RECIPE_MATCH_INDEX_LAG = 5 * 60
+RECIPE_MATCH_INDEX_GRACE = 60
+RECIPE_MATCH_INDEX_DELTA_SHARE = 0.1
+RECIPE_MATCH_MAX_RESULTS = int(os.getenv('RECIPE_MATCH_MAX_RESULTS', 1000))
+
+RECIPE_NEIGHBOURS = 20
+RECIPE_RECOMMENDATION_FAVORITES = 200
+
+RECIPE_BATCH_MAX_SIZE = 100
+
+TRENDING_WINDOW_HOURS = 7 * 24
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_WEIGHTS = {
+    'favorites': 1,
+    'shopping_cart': 2,
+}
+
+FEED_INBOX_SIZE = 500
+FEED_TRIM_SLACK = 100
+FEED_CELEBRITY_FOLLOWERS = int(os.getenv('FEED_CELEBRITY_FOLLOWERS', 5000))
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+)
+
 MAILING_EMAIL = 'Some@mail.ru'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
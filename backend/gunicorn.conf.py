@@ -0,0 +1,21 @@
+import os
+
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+# При threads > 1 gunicorn сам переходит на потоковые воркеры (gthread):
+# запрос, ждущий базу, не блокирует остальные. При DB_CONN_MAX_AGE > 0
+# каждый поток держит свое соединение с базой.
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+
+
+def on_starting(server):
+    # Число процессов можно задать и флагом --workers, которого настройки
+    # Django не видят, поэтому проверяем кеш еще раз перед запуском.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from django.conf import settings
+
+    backend = settings.CACHES[settings.API_CACHE_ALIAS]['BACKEND']
+    if server.cfg.workers > 1 and backend.endswith('LocMemCache'):
+        raise RuntimeError(
+            f'{server.cfg.workers} процесса gunicorn с LocMemCache будут '
+            f'отдавать устаревшие данные: задайте REDIS_URL'
+        )
@@ -7,6 +7,7 @@ from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('name', 'author', 'favorites_count',)
+    list_select_related = ('author',)
     list_filter = ('name', 'author', 'tags')
     search_fields = ('name', 'author', 'tags')
 
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import shopping_list, trending
+from .models import Recipe, ShoppingCart
+from .signals import RECIPE_COUNTERS
+
+# Вставка и удаление одним запросом с RETURNING обходят сигналы моделей,
+# поэтому их последствия повторяются здесь одним запросом на каждый вид.
+
+
+def update_counters(model, recipe_ids, delta):
+    # Каждая вставленная или удаленная строка связи меняет счетчик на
+    # delta: у пользователя не больше одной связи с рецептом. Сдвиг через
+    # F() не теряет изменений параллельных транзакций, в отличие от
+    # пересчета COUNT по своему снимку.
+    field = RECIPE_COUNTERS[model]
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        **{field: F(field) + delta}
+    )
+
+
+def insert_links(model, user, recipe_ids):
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {model._meta.db_table} '
+            f'(user_id, recipe_id, created_at) '
+            f'SELECT %s, id, %s FROM {Recipe._meta.db_table} '
+            f'WHERE id IN ({placeholders}) '
+            f'ON CONFLICT (user_id, recipe_id) DO NOTHING '
+            f'RETURNING recipe_id, created_at',
+            [user.id, created_at, *recipe_ids],
+        )
+        return dict(cursor.fetchall())
+
+
+def delete_links(model, user, recipe_ids):
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {model._meta.db_table} '
+            f'WHERE user_id = %s AND recipe_id IN ({placeholders}) '
+            f'RETURNING recipe_id, created_at',
+            [user.id, *recipe_ids],
+        )
+        return dict(cursor.fetchall())
+
+
+def to_datetime(value):
+    # SQLite возвращает из RETURNING строку без часового пояса в UTC.
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def apply_changes(model, user, changes, delta):
+    if not changes:
+        return
+    update_counters(model, list(changes), delta)
+    trending.record_many(model, [
+        (recipe_id, to_datetime(created_at))
+        for recipe_id, created_at in changes.items()
+    ], delta)
+    if model is ShoppingCart:
+        shopping_list.add_recipes(user.id, list(changes), delta)
+
+
+def add(model, user, recipe_ids):
+    created = insert_links(model, user, recipe_ids)
+    apply_changes(model, user, created, 1)
+    return set(created)
+
+
+def remove(model, user, recipe_ids):
+    removed = delete_links(model, user, recipe_ids)
+    apply_changes(model, user, removed, -1)
+    return set(removed)
@@ -0,0 +1,31 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes.Recipe', 'favorites_count', 'recipes.Favorite', 'recipe'),
+    ('recipes.Recipe', 'shopping_cart_count', 'recipes.ShoppingCart',
+     'recipe'),
+    ('users.User', 'recipes_count', 'recipes.Recipe', 'author'),
+    ('users.User', 'followers_count', 'users.Follow', 'author'),
+)
+
+
+def recount(apps):
+    fixed = {}
+    for model_name, field, related_name, lookup in COUNTERS:
+        model = apps.get_model(model_name)
+        related = apps.get_model(related_name)
+        actual = Coalesce(Subquery(
+            related.objects.filter(
+                **{lookup: OuterRef('pk')}
+            ).order_by().values(lookup).annotate(
+                total=Count('pk')
+            ).values('total')
+        ), 0)
+        drifted = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        ).values_list('pk', flat=True)
+        fixed[f'{model_name}.{field}'] = model.objects.filter(
+            pk__in=list(drifted)
+        ).update(**{field: actual})
+    return fixed
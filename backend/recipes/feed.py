@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Subquery
+
+from users.models import Follow
+from .models import FeedEntry, Recipe
+
+TABLE = FeedEntry._meta.db_table
+REBUILD = (
+    f'INSERT INTO {TABLE} (user_id, recipe_id, author_id) '
+    f'SELECT user_id, recipe_id, author_id FROM ('
+    f'SELECT follow.user_id, recipe.id AS recipe_id, recipe.author_id, '
+    f'ROW_NUMBER() OVER ('
+    f'PARTITION BY follow.user_id ORDER BY recipe.id DESC'
+    f') AS position '
+    f'FROM {Follow._meta.db_table} follow '
+    f'JOIN {Recipe._meta.db_table} recipe '
+    f'ON recipe.author_id = follow.author_id'
+    f') ranked WHERE position <= %s'
+)
+
+
+def is_celebrity(author):
+    return author.followers_count >= settings.FEED_CELEBRITY_FOLLOWERS
+
+
+def fan_out(recipe):
+    # У популярных авторов ленты собираются при чтении.
+    if is_celebrity(recipe.author):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TABLE} (user_id, recipe_id, author_id) '
+            f'SELECT user_id, %s, author_id '
+            f'FROM {Follow._meta.db_table} WHERE author_id = %s '
+            f'ON CONFLICT DO NOTHING',
+            [recipe.id, recipe.author_id],
+        )
+
+
+def backfill(user, author):
+    if is_celebrity(author):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TABLE} (user_id, recipe_id, author_id) '
+            f'SELECT %s, id, author_id FROM {Recipe._meta.db_table} '
+            f'WHERE author_id = %s ORDER BY id DESC LIMIT %s '
+            f'ON CONFLICT DO NOTHING',
+            [user.id, author.id, settings.FEED_INBOX_SIZE],
+        )
+
+
+def backfill_followers(author):
+    # Пока автор был популярным, его рецепты не раскладывались по лентам.
+    # Когда он опускается ниже порога, ленты подписчиков дополняются,
+    # иначе эти рецепты пропали бы из них.
+    if author.followers_count != settings.FEED_CELEBRITY_FOLLOWERS - 1:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TABLE} (user_id, recipe_id, author_id) '
+            f'SELECT follow.user_id, recipe.id, recipe.author_id '
+            f'FROM {Follow._meta.db_table} follow JOIN ('
+            f'SELECT id, author_id FROM {Recipe._meta.db_table} '
+            f'WHERE author_id = %s ORDER BY id DESC LIMIT %s'
+            f') recipe ON recipe.author_id = follow.author_id '
+            f'WHERE follow.author_id = %s '
+            f'ON CONFLICT DO NOTHING',
+            [author.id, settings.FEED_INBOX_SIZE, author.id],
+        )
+
+
+def remove_author(user, author):
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+def trim(user):
+    entries = FeedEntry.objects.filter(user=user).order_by('-recipe_id')
+    overflow = settings.FEED_INBOX_SIZE + settings.FEED_TRIM_SLACK
+    if not entries[overflow:overflow + 1].exists():
+        return
+    boundary = entries.values_list('recipe_id', flat=True)[
+        settings.FEED_INBOX_SIZE
+    ]
+    FeedEntry.objects.filter(user=user, recipe_id__lte=boundary).delete()
+
+
+def get_page(user, before=None, limit=10):
+    entries = FeedEntry.objects.filter(user=user)
+    celebrities = Recipe.objects.filter(author__in=Subquery(
+        Follow.objects.filter(
+            user=user,
+            author__followers_count__gte=settings.FEED_CELEBRITY_FOLLOWERS,
+        ).values('author')
+    ))
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+        celebrities = celebrities.filter(id__lt=before)
+    ids = set(entries.order_by('-recipe_id').values_list(
+        'recipe_id', flat=True
+    )[:limit + 1])
+    ids.update(celebrities.order_by('-id').values_list(
+        'id', flat=True
+    )[:limit + 1])
+    return sorted(ids, reverse=True)[:limit + 1]
+
+
+def rebuild():
+    FeedEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(REBUILD, [settings.FEED_INBOX_SIZE])
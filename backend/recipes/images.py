@@ -0,0 +1,118 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix='recipe-images',
+)
+
+
+def to_rgb(image):
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def process_image(file):
+    try:
+        image = Image.open(file)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Загрузите корректное изображение')
+    width, height = image.size
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise ValidationError('Слишком большое изображение')
+    max_size = (settings.RECIPE_IMAGE_MAX_SIZE,) * 2
+    if image.format == 'JPEG':
+        image.draft('RGB', max_size)
+    try:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(max_size)
+        image = to_rgb(image)
+    except OSError:
+        raise ValidationError('Загрузите корректное изображение')
+    output = BytesIO()
+    image.save(
+        output,
+        'JPEG',
+        quality=settings.RECIPE_IMAGE_QUALITY,
+        optimize=True,
+    )
+    return ContentFile(output.getvalue(), name=f'{uuid4().hex}.jpg')
+
+
+def get_variant_name(name, variant):
+    directory, filename = os.path.split(name)
+    root = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{root}.{variant}.webp')
+
+
+def save_variants(name):
+    missing = {
+        variant: size
+        for variant, size in settings.RECIPE_IMAGE_VARIANTS.items()
+        if not default_storage.exists(get_variant_name(name, variant))
+    }
+    if not missing:
+        return True
+    if not default_storage.exists(name):
+        return False
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image.load()
+        for variant, size in missing.items():
+            copy = image.copy()
+            copy.thumbnail(size)
+            output = BytesIO()
+            copy.save(
+                output,
+                'WEBP',
+                quality=settings.RECIPE_IMAGE_QUALITY,
+            )
+            default_storage.save(
+                get_variant_name(name, variant),
+                ContentFile(output.getvalue()),
+            )
+    return True
+
+
+def build_variants(recipe_id, name):
+    if not save_variants(name):
+        return
+    # Отметка в рецепте заменяет проверку файлов на каждом запросе;
+    # сохранение сбрасывает кеш ответов и ETag рецептов.
+    recipe = Recipe.objects.filter(id=recipe_id, image=name).first()
+    if recipe is not None and recipe.image_variants_for != name:
+        recipe.image_variants_for = name
+        recipe.save(update_fields=['image_variants_for', 'updated_at'])
+
+
+def refresh_variants(recipe_id, name):
+    try:
+        build_variants(recipe_id, name)
+    finally:
+        connection.close()
+
+
+def schedule_variants(recipe_id, name):
+    transaction.on_commit(
+        lambda: executor.submit(refresh_variants, recipe_id, name)
+    )
+
+
+def get_variant_url(image, variant):
+    if image.instance.image_variants_for == image.name:
+        return default_storage.url(get_variant_name(image.name, variant))
+    return default_storage.url(image.name)
@@ -0,0 +1,34 @@
+import resource
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие рецепты по совместным добавлениям '
+        'в избранное и список покупок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbours', type=int,
+                            default=settings.RECIPE_NEIGHBOURS)
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Рецептов в одном блоке умножения')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Строк в одной вставке')
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        recipes, saved = recommendations.build(
+            options['neighbours'], options['chunk_size'],
+            options['batch_size'],
+        )
+        self.stdout.write(
+            f'{recipes} рецептов, {saved} соседей за '
+            f'{perf_counter() - started:.1f} с, пик памяти '
+            f'{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024} МБ'
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет сохраненные списки покупок с суммой ингредиентов '
+        'рецептов из корзин'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Пересобрать расходящиеся списки')
+
+    def handle(self, *args, **options):
+        mismatched = shopping_list.check()
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        self.stdout.write(
+            f'Расходятся списки {len(mismatched)} пользователей: '
+            + ', '.join(map(str, mismatched[:20]))
+        )
+        if not options['fix']:
+            raise CommandError('Запустите с --fix, чтобы пересобрать списки')
+        with transaction.atomic():
+            shopping_list.rebuild(mismatched)
+        self.stdout.write(self.style.SUCCESS('Списки пересобраны'))
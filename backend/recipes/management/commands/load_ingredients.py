@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.cache import invalidate
+from recipes.models import Ingredient
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def read_json(file, chunk_size=64 * 1024):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    for chunk in iter(lambda: file.read(chunk_size), ''):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise CommandError('Ожидается JSON-массив ингредиентов')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                break
+            yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+class Command(BaseCommand):
+    help = 'Загружает каталог ингредиентов из CSV или JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=READERS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Использовать COPY (только PostgreSQL)',
+        )
+
+    def batches(self, rows, size):
+        rows = iter(rows)
+        batch = list(islice(rows, size))
+        while batch:
+            yield batch
+            batch = list(islice(rows, size))
+
+    def insert(self, batch):
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=measurement_unit)
+             for name, measurement_unit in batch),
+            ignore_conflicts=True,
+        )
+
+    def copy(self, batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        table = Ingredient._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredients_copy '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY ingredients_copy (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit, updated_at) '
+                'SELECT name, measurement_unit, now() FROM ingredients_copy '
+                'ON CONFLICT DO NOTHING'
+            )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.')
+        )
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('COPY поддерживается только в PostgreSQL')
+        write = self.copy if options['copy'] else self.insert
+        # Повторы внутри пакета отбрасываются здесь, повторы с уже
+        # загруженными строками — ограничением unique_ingredient.
+        before = Ingredient.objects.count()
+        read = 0
+        started = perf_counter()
+        with open(path, encoding='utf-8') as file:
+            rows = READERS[file_format](file)
+            for batch in self.batches(rows, options['batch_size']):
+                read += len(batch)
+                write(list(dict.fromkeys(
+                    (name.strip(), measurement_unit.strip())
+                    for name, measurement_unit in batch
+                )))
+        created = Ingredient.objects.count() - before
+        if created:
+            # Массовая вставка обходит post_save, поэтому кеш ответов и
+            # ETag сбрасываются здесь.
+            invalidate('ingredients', 'recipes')
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано {read}, добавлено {created}, '
+            f'пропущено {read - created} за {elapsed:.2f} с '
+            f'({read / max(elapsed, 1e-6):.0f} строк/с)'
+        ))
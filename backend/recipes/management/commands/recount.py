@@ -0,0 +1,15 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики рецептов и авторов'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recount(apps)
+        for counter, rows in fixed.items():
+            self.stdout.write(f'{counter}: исправлено {rows}')
@@ -0,0 +1,19 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг популярных рецептов по почасовой активности '
+        'с экспоненциальным затуханием; запускается по расписанию'
+    )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        recipes = trending.rollup()
+        self.stdout.write(
+            f'{recipes} рецептов за {perf_counter() - started:.1f} с'
+        )
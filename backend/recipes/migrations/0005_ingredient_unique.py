@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:39
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+AMOUNT_MAX = 32767
+
+
+def merge_into(RecipeIngredient, keep_id, duplicate_ids):
+    for item in RecipeIngredient.objects.filter(
+        ingredients__in=duplicate_ids,
+    ).order_by('id'):
+        kept = RecipeIngredient.objects.filter(
+            recipe_id=item.recipe_id, ingredients_id=keep_id,
+        ).first()
+        if kept is None:
+            item.ingredients_id = keep_id
+            item.save(update_fields=['ingredients'])
+            continue
+        # Рецепт ссылался на оба дубля: количества складываются.
+        kept.amount = min(kept.amount + item.amount, AMOUNT_MAX)
+        kept.save(update_fields=['amount'])
+        item.delete()
+
+
+def merge_duplicates(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    groups = Ingredient.objects.values(
+        'name', 'measurement_unit',
+    ).annotate(keep_id=Min('id'), total=Count('id')).filter(total__gt=1)
+    for group in list(groups):
+        duplicate_ids = list(Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit'],
+        ).exclude(id=group['keep_id']).values_list('id', flat=True))
+        merge_into(RecipeIngredient, group['keep_id'], duplicate_ids)
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+    if schema_editor.connection.vendor == 'postgresql':
+        # Отложенные проверки внешних ключей после удалений не дают
+        # изменить таблицу в той же транзакции.
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
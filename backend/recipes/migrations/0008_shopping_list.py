@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0007_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(default=0, verbose_name='Кол-во/Объем/Масса')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to='recipes.Ingredient')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Списки покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='shopping_list_item'),
+        ),
+        migrations.RunSQL(
+            'INSERT INTO recipes_shoppinglistitem '
+            '(user_id, ingredient_id, amount) '
+            'SELECT cart.user_id, link.ingredients_id, SUM(link.amount) '
+            'FROM recipes_shoppingcart cart '
+            'JOIN recipes_recipeingredient link '
+            'ON link.recipe_id = cart.recipe_id '
+            'GROUP BY cart.user_id, link.ingredients_id',
+            migrations.RunSQL.noop,
+        ),
+    ]
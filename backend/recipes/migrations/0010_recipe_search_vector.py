@@ -0,0 +1,152 @@
+from django.db import migrations
+
+CREATE_SEARCH = (
+    'ALTER TABLE recipes_recipe '
+    'ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    """
+    CREATE OR REPLACE FUNCTION recipes_recipe_build_search_vector(
+        integer, text, text
+    ) RETURNS tsvector LANGUAGE sql STABLE AS $$
+        SELECT setweight(to_tsvector('russian', coalesce($2, '')), 'A')
+            || setweight(to_tsvector(
+                'russian', coalesce(string_agg(ingredient.name, ' '), '')
+            ), 'B')
+            || setweight(to_tsvector('russian', coalesce($3, '')), 'C')
+        FROM recipes_recipeingredient link
+        JOIN recipes_ingredient ingredient
+            ON ingredient.id = link.ingredients_id
+        WHERE link.recipe_id = $1
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION recipes_recipe_search_trigger()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector := recipes_recipe_build_search_vector(
+            NEW.id, NEW.name, NEW.text
+        );
+        RETURN NEW;
+    END
+    $$
+    """,
+    # Триггеры на связи и ингредиенты срабатывают один раз на
+    # инструкцию: bulk_create связей рецепта пересчитывает вектор
+    # однажды, а не на каждую строку.
+    """
+    CREATE OR REPLACE FUNCTION recipes_recipeingredient_search_trigger()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE recipes_recipe
+            SET search_vector = recipes_recipe_build_search_vector(
+                id, name, text
+            )
+            WHERE id IN (SELECT recipe_id FROM new_links);
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE recipes_recipe
+            SET search_vector = recipes_recipe_build_search_vector(
+                id, name, text
+            )
+            WHERE id IN (SELECT recipe_id FROM old_links);
+        ELSE
+            UPDATE recipes_recipe
+            SET search_vector = recipes_recipe_build_search_vector(
+                id, name, text
+            )
+            WHERE id IN (
+                SELECT recipe_id FROM old_links
+                UNION SELECT recipe_id FROM new_links
+            );
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION recipes_ingredient_search_trigger()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE recipes_recipe
+        SET search_vector = recipes_recipe_build_search_vector(
+            id, name, text
+        )
+        WHERE id IN (
+            SELECT link.recipe_id FROM recipes_recipeingredient link
+            JOIN new_ingredients ON new_ingredients.id = link.ingredients_id
+            JOIN old_ingredients ON old_ingredients.id = new_ingredients.id
+            WHERE old_ingredients.name IS DISTINCT FROM new_ingredients.name
+        );
+        RETURN NULL;
+    END
+    $$
+    """,
+    'CREATE TRIGGER recipes_recipe_search '
+    'BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe '
+    'FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_trigger()',
+    # Таблицы переходов допускают только одно событие на триггер.
+    'CREATE TRIGGER recipes_recipeingredient_search_insert '
+    'AFTER INSERT ON recipes_recipeingredient '
+    'REFERENCING NEW TABLE AS new_links '
+    'FOR EACH STATEMENT '
+    'EXECUTE PROCEDURE recipes_recipeingredient_search_trigger()',
+    'CREATE TRIGGER recipes_recipeingredient_search_delete '
+    'AFTER DELETE ON recipes_recipeingredient '
+    'REFERENCING OLD TABLE AS old_links '
+    'FOR EACH STATEMENT '
+    'EXECUTE PROCEDURE recipes_recipeingredient_search_trigger()',
+    'CREATE TRIGGER recipes_recipeingredient_search_update '
+    'AFTER UPDATE ON recipes_recipeingredient '
+    'REFERENCING OLD TABLE AS old_links NEW TABLE AS new_links '
+    'FOR EACH STATEMENT '
+    'EXECUTE PROCEDURE recipes_recipeingredient_search_trigger()',
+    'CREATE TRIGGER recipes_ingredient_search '
+    'AFTER UPDATE ON recipes_ingredient '
+    'REFERENCING OLD TABLE AS old_ingredients '
+    'NEW TABLE AS new_ingredients '
+    'FOR EACH STATEMENT EXECUTE PROCEDURE recipes_ingredient_search_trigger()',
+    'UPDATE recipes_recipe '
+    'SET search_vector = recipes_recipe_build_search_vector(id, name, text)',
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector '
+    'ON recipes_recipe USING gin (search_vector)',
+)
+
+DROP_SEARCH = (
+    'DROP TRIGGER IF EXISTS recipes_ingredient_search '
+    'ON recipes_ingredient',
+    'DROP TRIGGER IF EXISTS recipes_recipeingredient_search_update '
+    'ON recipes_recipeingredient',
+    'DROP TRIGGER IF EXISTS recipes_recipeingredient_search_delete '
+    'ON recipes_recipeingredient',
+    'DROP TRIGGER IF EXISTS recipes_recipeingredient_search_insert '
+    'ON recipes_recipeingredient',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search ON recipes_recipe',
+    'DROP FUNCTION IF EXISTS recipes_ingredient_search_trigger()',
+    'DROP FUNCTION IF EXISTS recipes_recipeingredient_search_trigger()',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_trigger()',
+    'DROP FUNCTION IF EXISTS '
+    'recipes_recipe_build_search_vector(integer, text, text)',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+
+
+def run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgres(CREATE_SEARCH),
+            run_on_postgres(DROP_SEARCH),
+        ),
+    ]
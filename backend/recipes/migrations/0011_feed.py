@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Копия recipes.feed.REBUILD на момент миграции: дальнейшие правки модуля
+# не должны менять уже примененную миграцию.
+REBUILD = (
+    'INSERT INTO recipes_feedentry (user_id, recipe_id, author_id) '
+    'SELECT user_id, recipe_id, author_id FROM ('
+    'SELECT follow.user_id, recipe.id AS recipe_id, recipe.author_id, '
+    'ROW_NUMBER() OVER ('
+    'PARTITION BY follow.user_id ORDER BY recipe.id DESC'
+    ') AS position '
+    'FROM users_follow follow '
+    'JOIN recipes_recipe recipe ON recipe.author_id = follow.author_id'
+    ') ranked WHERE position <= %s'
+)
+
+
+def fill_feeds(apps, schema_editor):
+    schema_editor.execute(REBUILD, [settings.FEED_INBOX_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0010_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.Recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Ленты подписок',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
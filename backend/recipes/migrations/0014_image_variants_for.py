@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:49
+
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def get_variant_name(name, variant):
+    directory, filename = os.path.split(name)
+    root = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{root}.{variant}.webp')
+
+
+def mark_built_variants(apps, schema_editor):
+    # Уже построенные копии проверяются один раз здесь, дальше отметку
+    # ставит фоновая сборка.
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for recipe_id, name in Recipe.objects.exclude(
+        image='',
+    ).values_list('id', 'image').iterator():
+        if all(
+            default_storage.exists(get_variant_name(name, variant))
+            for variant in settings.RECIPE_IMAGE_VARIANTS
+        ):
+            Recipe.objects.filter(id=recipe_id).update(
+                image_variants_for=name,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants_for',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Уменьшенные копии построены для'),
+        ),
+        migrations.RunPython(mark_built_variants, migrations.RunPython.noop),
+    ]
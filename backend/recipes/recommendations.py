@@ -0,0 +1,120 @@
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from scipy import sparse
+
+from .models import Favorite, RecipeNeighbour, ShoppingCart
+
+
+def fetch_interactions():
+    pairs = chain.from_iterable(
+        model.objects.values_list('user_id', 'recipe_id').iterator()
+        for model in (Favorite, ShoppingCart)
+    )
+    values = np.fromiter(chain.from_iterable(pairs), dtype=np.int64)
+    return values[0::2], values[1::2]
+
+
+def build_matrix(users, recipes):
+    # Строки — рецепты, столбцы — пользователи; строки нормированы,
+    # поэтому произведение строк сразу дает косинусное сходство.
+    recipe_ids, rows = np.unique(recipes, return_inverse=True)
+    _, columns = np.unique(users, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+        shape=(len(recipe_ids), columns.max() + 1 if len(columns) else 0),
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    norms = np.sqrt(np.diff(matrix.indptr)).astype(np.float32)
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+    return recipe_ids, matrix
+
+
+def top_k(rows, columns, scores, k):
+    order = np.lexsort((-scores, rows))
+    rows, columns, scores = rows[order], columns[order], scores[order]
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = ranks < k
+    return rows[keep], columns[keep], scores[keep]
+
+
+def compute_neighbours(matrix, k, chunk_size):
+    transposed = matrix.T.tocsr()
+    for start in range(0, matrix.shape[0], chunk_size):
+        similarity = (matrix[start:start + chunk_size] @ transposed).tocoo()
+        rows = similarity.row.astype(np.int64) + start
+        columns = similarity.col.astype(np.int64)
+        other = rows != columns
+        yield top_k(
+            rows[other], columns[other], similarity.data[other], k
+        )
+
+
+def get_batch_size(batch_size):
+    # SQLite ограничивает число параметров и строк в одной вставке.
+    fields = [
+        field for field in RecipeNeighbour._meta.concrete_fields
+        if not field.primary_key
+    ]
+    return min(
+        batch_size,
+        connection.ops.bulk_batch_size(fields, range(batch_size)),
+    )
+
+
+def replace_neighbours(lower, upper, neighbours, batch_size):
+    stale = RecipeNeighbour.objects.all()
+    if lower is not None:
+        stale = stale.filter(recipe_id__gte=lower)
+    if upper is not None:
+        stale = stale.filter(recipe_id__lt=upper)
+    with transaction.atomic():
+        stale.delete()
+        RecipeNeighbour.objects.bulk_create(neighbours, batch_size=batch_size)
+
+
+def build(k=None, chunk_size=1000, batch_size=1000):
+    k = k or settings.RECIPE_NEIGHBOURS
+    batch_size = get_batch_size(batch_size)
+    recipe_ids, matrix = build_matrix(*fetch_interactions())
+    if not len(recipe_ids):
+        RecipeNeighbour.objects.all().delete()
+        return 0, 0
+    # Каждый блок рецептов заменяется своей короткой транзакцией по
+    # диапазону id: читатели видят у рецепта либо старых соседей, либо
+    # новых, а рецепты без взаимодействий теряют соседей вместе с блоком.
+    bounds = recipe_ids[chunk_size::chunk_size].tolist()
+    saved = 0
+    for (rows, columns, scores), lower, upper in zip(
+        compute_neighbours(matrix, k, chunk_size),
+        [None] + bounds,
+        bounds + [None],
+    ):
+        replace_neighbours(lower, upper, (
+            RecipeNeighbour(recipe_id=recipe_id, neighbour_id=neighbour_id,
+                            score=score)
+            for recipe_id, neighbour_id, score in zip(
+                recipe_ids[rows].tolist(),
+                recipe_ids[columns].tolist(),
+                scores.tolist(),
+            )
+        ), batch_size)
+        saved += len(rows)
+    return len(recipe_ids), saved
+
+
+def recommend(user):
+    favorites = Favorite.objects.filter(user=user).order_by('-id').values(
+        'recipe'
+    )[:settings.RECIPE_RECOMMENDATION_FAVORITES]
+    return RecipeNeighbour.objects.filter(
+        recipe__in=favorites,
+    ).exclude(
+        neighbour__favorites__user=user,
+    ).values('neighbour').annotate(
+        total=Sum('score'),
+    ).order_by('-total', '-neighbour')
@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Sum
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+TABLE = ShoppingListItem._meta.db_table
+UPSERT = (
+    f'INSERT INTO {TABLE} (user_id, ingredient_id, amount) {{values}} '
+    f'ON CONFLICT (user_id, ingredient_id) '
+    f'DO UPDATE SET amount = {TABLE}.amount + excluded.amount'
+)
+
+
+def cleanup(**filters):
+    ShoppingListItem.objects.filter(amount__lte=0, **filters).delete()
+
+
+def add_recipes(user_id, recipe_ids, sign=1):
+    if not recipe_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT.format(values=(
+            f'SELECT %s, ingredients_id, %s * SUM(amount) '
+            f'FROM {RecipeIngredient._meta.db_table} '
+            f'WHERE recipe_id IN ({placeholders}) GROUP BY ingredients_id'
+        )), [user_id, sign, *recipe_ids])
+    if sign < 0:
+        cleanup(user_id=user_id)
+
+
+def add_recipe(user_id, recipe_id, sign=1):
+    add_recipes(user_id, [recipe_id], sign)
+
+
+def remove_recipe(user_id, recipe_id):
+    add_recipe(user_id, recipe_id, -1)
+
+
+def change_recipe_ingredients(recipe_id, deltas):
+    deltas = [
+        (ingredient_id, delta, recipe_id)
+        for ingredient_id, delta in deltas.items() if delta
+    ]
+    if not deltas:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(UPSERT.format(values=(
+            f'SELECT user_id, %s, %s '
+            f'FROM {ShoppingCart._meta.db_table} WHERE recipe_id = %s'
+        )), deltas)
+    if any(delta < 0 for _, delta, _ in deltas):
+        cleanup(user__shopping_cart__recipe_id=recipe_id)
+
+
+def get_expected(user_ids=None):
+    if user_ids is None:
+        links = RecipeIngredient.objects.filter(
+            recipe__shopping_cart__isnull=False
+        )
+    else:
+        links = RecipeIngredient.objects.filter(
+            recipe__shopping_cart__user__in=user_ids
+        )
+    # Нулевые суммы не хранятся: cleanup удаляет такие строки.
+    return links.values_list(
+        'recipe__shopping_cart__user', 'ingredients',
+    ).annotate(total=Sum('amount')).filter(total__gt=0).order_by()
+
+
+def rebuild(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user__in=user_ids)
+    items.delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                         amount=total)
+        for user_id, ingredient_id, total in get_expected(user_ids).iterator()
+    )
+
+
+def check(user_ids=None):
+    expected = defaultdict(dict)
+    for user_id, ingredient_id, total in get_expected(user_ids).iterator():
+        expected[user_id][ingredient_id] = total
+    actual = defaultdict(dict)
+    items = ShoppingListItem.objects.values_list(
+        'user', 'ingredient', 'amount'
+    )
+    if user_ids is not None:
+        items = items.filter(user__in=user_ids)
+    for user_id, ingredient_id, amount in items.iterator():
+        actual[user_id][ingredient_id] = amount
+    return sorted(
+        user_id for user_id in expected.keys() | actual.keys()
+        if expected.get(user_id) != actual.get(user_id)
+    )
@@ -0,0 +1,77 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import reduce
+from math import exp, log
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Favorite, RecipeActivity, ShoppingCart, TrendingRecipe
+
+COLUMNS = {
+    Favorite: 'favorites',
+    ShoppingCart: 'shopping_cart',
+}
+
+
+def get_bucket(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record_many(model, events, delta=1):
+    column = COLUMNS[model]
+    counts = Counter(
+        (recipe_id, get_bucket(created_at)) for recipe_id, created_at in events
+    )
+    if delta > 0:
+        RecipeActivity.objects.bulk_create(
+            [RecipeActivity(recipe_id=recipe_id, bucket=bucket)
+             for recipe_id, bucket in counts],
+            ignore_conflicts=True,
+        )
+    # Удаление старого события не создает корзину заново: она уже
+    # могла выпасть из окна.
+    groups = defaultdict(list)
+    for key, count in counts.items():
+        groups[count].append(key)
+    for count, keys in groups.items():
+        RecipeActivity.objects.filter(reduce(or_, (
+            Q(recipe_id=recipe_id, bucket=bucket) for recipe_id, bucket in keys
+        ))).update(**{column: F(column) + delta * count})
+
+
+def record(model, recipe_id, created_at, delta=1):
+    record_many(model, [(recipe_id, created_at)], delta)
+
+
+def rollup(now=None):
+    now = now or timezone.now()
+    RecipeActivity.objects.filter(
+        bucket__lt=now - timedelta(hours=settings.TRENDING_WINDOW_HOURS),
+    ).delete()
+    decay = log(2) / settings.TRENDING_HALF_LIFE_HOURS
+    weights = settings.TRENDING_WEIGHTS
+    scores = defaultdict(float)
+    for recipe_id, bucket, favorites, shopping_cart in (
+        RecipeActivity.objects.values_list(
+            'recipe', 'bucket', 'favorites', 'shopping_cart'
+        ).iterator()
+    ):
+        age = max((now - bucket).total_seconds() / 3600, 0)
+        scores[recipe_id] += (
+            favorites * weights['favorites']
+            + shopping_cart * weights['shopping_cart']
+        ) * exp(-decay * age)
+    with transaction.atomic():
+        TrendingRecipe.objects.all().delete()
+        TrendingRecipe.objects.bulk_create(
+            (
+                TrendingRecipe(recipe_id=recipe_id, score=score)
+                for recipe_id, score in scores.items() if score > 0
+            ),
+            batch_size=1000,
+        )
+    return len(scores)
@@ -20,6 +20,10 @@ class Tag(models.Model):
         unique=True,
         verbose_name='Slug',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено',
+    )
 
     class Meta:
         verbose_name = 'Тэг'
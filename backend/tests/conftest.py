@@ -0,0 +1,124 @@
+import pytest
+
+IMAGE = 'recipes/images/test.png'
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(settings, tmp_path):
+    from django.core.cache import caches
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.RECIPE_MATCH_INDEX_DIR = str(tmp_path / 'indexes')
+    caches['default'].clear()
+    yield
+    caches['default'].clear()
+
+
+@pytest.fixture(autouse=True)
+def no_background_index_updates(monkeypatch, settings, isolated_caches):
+    # Фоновая пересборка индекса ингредиентов читает базу из другого
+    # потока и мешает очистке тестовой базы.
+    from api import ingredient_index
+
+    monkeypatch.setattr(ingredient_index, 'submit_update', lambda: None)
+    for name, value in (('path', settings.RECIPE_MATCH_INDEX_DIR),
+                        ('generation', None), ('index', None),
+                        ('checked', None)):
+        monkeypatch.setattr(ingredient_index.ingredient_index, name, value)
+
+
+@pytest.fixture(autouse=True)
+def no_background_image_variants(monkeypatch):
+    # Копии изображений строятся в тестах явно, фоновая сборка могла бы
+    # обратиться к базе уже после очистки.
+    from recipes import signals
+
+    monkeypatch.setattr(signals, 'schedule_variants', lambda *args: None)
+
+
+@pytest.fixture
+def make_user(django_user_model):
+    def make_user(username):
+        return django_user_model.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='password',
+        )
+    return make_user
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user('user')
+
+
+@pytest.fixture
+def author(make_user):
+    return make_user('author')
+
+
+@pytest.fixture
+def tags():
+    from tags.models import Tag
+
+    return [
+        Tag.objects.create(name=f'Тег {number}', color=f'#00000{number}',
+                           slug=f'tag-{number}')
+        for number in range(2)
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    from recipes.models import Ingredient
+
+    return [
+        Ingredient.objects.create(name=f'Ингредиент {number:02}',
+                                  measurement_unit='г')
+        for number in range(10)
+    ]
+
+
+@pytest.fixture
+def make_recipes(tags, ingredients):
+    from recipes.models import Recipe, RecipeIngredient
+
+    def make_recipes(author, count):
+        recipes = []
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                image=IMAGE, cooking_time=10,
+            )
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredients=ingredient,
+                                 amount=offset + 1)
+                for offset, ingredient in enumerate(
+                    ingredients[number % 5:number % 5 + 3]
+                )
+            )
+            recipes.append(recipe)
+        return recipes
+    return make_recipes
+
+
+@pytest.fixture
+def recipes(author, make_recipes):
+    return make_recipes(author, 12)
+
+
+@pytest.fixture
+def anonymous_client():
+    from rest_framework.test import APIClient
+
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
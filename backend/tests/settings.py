@@ -0,0 +1,13 @@
+import os
+
+from dotenv import load_dotenv
+
+# Без .env тесты идут на SQLite; для проверок, завязанных на PostgreSQL,
+# достаточно задать DB_ENGINE и параметры подключения.
+load_dotenv()
+os.environ.setdefault('DJANGO_KEY', 'tests')
+os.environ.setdefault('DB_ENGINE', 'django.db.backends.sqlite3')
+os.environ.setdefault('DB_NAME', 'foodgram-tests.sqlite3')
+os.environ.setdefault('API_LOCAL_CACHE', 'True')
+
+from foodgram.settings import *  # noqa: F401, F403
@@ -0,0 +1,81 @@
+import pytest
+from django.apps import apps
+
+from recipes.counters import recount
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.signals import RECIPE_COUNTERS
+
+pytestmark = pytest.mark.django_db
+
+URLS = {
+    Favorite: '/api/recipes/favorite/',
+    ShoppingCart: '/api/recipes/shopping_cart/',
+}
+# Запросы не зависят от числа рецептов в пакете.
+QUERIES = {
+    ('post', Favorite): 6,
+    ('post', ShoppingCart): 7,
+    ('delete', Favorite): 5,
+    ('delete', ShoppingCart): 8,
+}
+
+
+def send(client, method, model, recipe_ids):
+    return getattr(client, method)(
+        URLS[model], {'recipes': recipe_ids}, format='json',
+    )
+
+
+@pytest.mark.parametrize('model', (Favorite, ShoppingCart))
+@pytest.mark.parametrize('size', (1, 12))
+def test_batch_add_and_remove_queries(user_client, recipes, model, size,
+                                      django_assert_num_queries):
+    recipe_ids = [recipe.id for recipe in recipes[:size]]
+    for method, status in (('post', 'created'), ('delete', 'deleted')):
+        with django_assert_num_queries(QUERIES[method, model]):
+            response = send(user_client, method, model, recipe_ids)
+        assert response.status_code == 200
+        assert response.data['results'] == [
+            {'id': recipe_id, 'status': status} for recipe_id in recipe_ids
+        ]
+
+
+@pytest.mark.parametrize('model', (Favorite, ShoppingCart))
+def test_batch_add_with_existing_and_missing(user, user_client, recipes,
+                                             model,
+                                             django_assert_num_queries):
+    send(user_client, 'post', model,
+         [recipe.id for recipe in recipes[:4]])
+    missing = recipes[-1].id + 1
+    recipe_ids = [recipe.id for recipe in recipes[2:8]] + [missing]
+    # Для рецептов, которые не удалось добавить, нужен еще один
+    # запрос: отличить уже добавленные от несуществующих.
+    with django_assert_num_queries(QUERIES['post', model] + 1):
+        response = send(user_client, 'post', model, recipe_ids)
+    assert response.status_code == 200
+    assert response.data['results'] == [
+        {'id': recipe_id, 'status': status}
+        for recipe_id, status in zip(recipe_ids, (
+            'exists', 'exists', 'created', 'created', 'created', 'created',
+            'not_found',
+        ))
+    ]
+    assert model.objects.filter(user=user).count() == 8
+    assert not any(recount(apps).values())
+
+
+@pytest.mark.parametrize('model', (Favorite, ShoppingCart))
+def test_batch_changes_counters_by_delta(user_client, make_user, recipes,
+                                         model):
+    field = RECIPE_COUNTERS[model]
+    other = make_user('other')
+    model.objects.create(user=other, recipe=recipes[0])
+    recipe_ids = [recipe.id for recipe in recipes[:3]]
+    send(user_client, 'post', model, recipe_ids)
+    assert list(Recipe.objects.filter(id__in=recipe_ids).order_by(
+        'id'
+    ).values_list(field, flat=True)) == [2, 1, 1]
+    send(user_client, 'delete', model, recipe_ids)
+    assert list(Recipe.objects.filter(id__in=recipe_ids).order_by(
+        'id'
+    ).values_list(field, flat=True)) == [1, 0, 0]
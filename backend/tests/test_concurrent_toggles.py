@@ -0,0 +1,96 @@
+import threading
+from collections import Counter
+
+import pytest
+from django.apps import apps
+from django.db import connection
+from rest_framework.test import APIClient
+
+from recipes import shopping_list
+from recipes.counters import recount
+
+# Гонки переключений проявляются только на PostgreSQL: SQLite
+# сериализует запись блокировкой всей базы.
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Параллельная запись проверяется только на PostgreSQL',
+)
+
+THREADS = 8
+ROUNDS = 6
+PATHS = {
+    'favorite': '/api/recipes/{recipe}/favorite/',
+    'shopping_cart': '/api/recipes/{recipe}/shopping_cart/',
+    'subscribe': '/api/users/{author}/subscribe/',
+}
+SUCCESS = {'post': 201, 'delete': 204}
+
+
+def get_method(number):
+    return 'post' if number % 2 == 0 else 'delete'
+
+
+def worker(user, paths, barrier, results, lock):
+    client = APIClient()
+    client.force_authenticate(user)
+    try:
+        for number in range(ROUNDS):
+            barrier.wait()
+            for name, path in paths.items():
+                try:
+                    status = getattr(client, get_method(number))(
+                        path
+                    ).status_code
+                except Exception as error:
+                    status = type(error).__name__
+                with lock:
+                    results[number, name][status] += 1
+    finally:
+        connection.close()
+
+
+def run_toggles(users, recipe):
+    paths = {
+        name: path.format(recipe=recipe.id, author=recipe.author_id)
+        for name, path in PATHS.items()
+    }
+    barrier = threading.Barrier(len(users))
+    results = {
+        (number, name): Counter()
+        for number in range(ROUNDS) for name in paths
+    }
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(
+            target=worker, args=(user, paths, barrier, results, lock),
+        )
+        for user in users
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_parallel_toggles_keep_one_winner(transactional_db, user, recipes):
+    results = run_toggles([user] * THREADS, recipes[0])
+    for (number, name), statuses in results.items():
+        success = SUCCESS[get_method(number)]
+        assert statuses == {success: 1, 400: THREADS - 1}, (number, name)
+    assert not any(recount(apps).values())
+    assert not shopping_list.check([user.id])
+
+
+def test_parallel_toggles_of_different_users_keep_counters(
+    transactional_db, make_user, recipes,
+):
+    # Разные пользователи не спорят за одну строку связи, зато меняют
+    # одни и те же счетчики рецепта и автора.
+    users = [make_user(f'user{number}') for number in range(THREADS)]
+    results = run_toggles(users, recipes[0])
+    for (number, name), statuses in results.items():
+        success = SUCCESS[get_method(number)]
+        assert statuses == {success: THREADS}, (number, name)
+    assert not any(recount(apps).values())
+    assert not shopping_list.check([user.id for user in users])
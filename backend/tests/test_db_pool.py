@@ -0,0 +1,80 @@
+import pytest
+from django.db import connection
+
+from foodgram.db_pool import pools
+from foodgram.db_pool.base import DatabaseWrapper
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(connection.vendor != 'postgresql',
+                       reason='Пул соединений работает только с PostgreSQL'),
+]
+ALIAS = 'pool-test'
+
+
+@pytest.fixture
+def make_wrapper():
+    wrappers = []
+
+    def make_wrapper(**options):
+        wrapper = DatabaseWrapper({
+            **connection.settings_dict,
+            'ENGINE': 'foodgram.db_pool',
+            'POOL_SIZE': 2,
+            'POOL_TIMEOUT': 1,
+            **options,
+        }, ALIAS)
+        wrappers.append(wrapper)
+        return wrapper
+
+    yield make_wrapper
+    for wrapper in wrappers:
+        wrapper.close()
+    pool = pools.pop(ALIAS, None)
+    if pool is not None:
+        pool.close()
+
+
+def query(wrapper):
+    with wrapper.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.parametrize('health_checks', (False, True))
+def test_connection_is_reused(make_wrapper, health_checks):
+    first = make_wrapper(HEALTH_CHECKS=health_checks)
+    assert query(first) == 1
+    raw = first.connection
+    first.close()
+    second = make_wrapper(HEALTH_CHECKS=health_checks)
+    assert query(second) == 1
+    assert second.connection is raw
+    assert second.connection.autocommit
+    stats = pools[ALIAS].stats()
+    assert stats['checkouts'] == 2
+    assert stats['discarded'] == 0
+
+
+def test_broken_connection_is_replaced(make_wrapper):
+    first = make_wrapper(HEALTH_CHECKS=True)
+    query(first)
+    raw = first.connection
+    first.close()
+    raw.close()
+    second = make_wrapper(HEALTH_CHECKS=True)
+    assert query(second) == 1
+    assert second.connection is not raw
+    assert pools[ALIAS].stats()['discarded'] == 1
+
+
+def test_open_transaction_is_rolled_back_on_release(make_wrapper):
+    first = make_wrapper()
+    first.set_autocommit(False)
+    query(first)
+    raw = first.connection
+    pools[ALIAS].release(raw)
+    first.connection = None
+    second = make_wrapper(HEALTH_CHECKS=True)
+    assert query(second) == 1
+    assert second.connection is raw
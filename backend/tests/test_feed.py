@@ -0,0 +1,44 @@
+import pytest
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+
+def get_feed_ids(client, **params):
+    response = client.get('/api/recipes/feed/', params)
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+def make_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def test_recipes_posted_as_celebrity_stay_after_demotion(
+    user, user_client, author, make_user, make_recipes, settings,
+):
+    settings.FEED_CELEBRITY_FOLLOWERS = 2
+    other_client = make_client(make_user('other'))
+    for client in (user_client, other_client):
+        assert client.post(
+            f'/api/users/{author.id}/subscribe/'
+        ).status_code == 201
+    # Рецепты популярного автора не раскладываются по лентам.
+    recipe_ids = sorted(
+        (recipe.id for recipe in make_recipes(author, 3)), reverse=True,
+    )
+    assert get_feed_ids(user_client) == recipe_ids
+
+    assert other_client.delete(
+        f'/api/users/{author.id}/subscribe/'
+    ).status_code == 204
+    assert get_feed_ids(user_client) == recipe_ids
+
+
+@pytest.mark.parametrize('before', ('²', '-', 'abc'))
+def test_invalid_before_is_rejected(user_client, before):
+    response = user_client.get('/api/recipes/feed/', {'before': before})
+    assert response.status_code == 400
+    assert 'before' in response.data
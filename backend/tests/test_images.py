@@ -0,0 +1,55 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from recipes.images import build_variants, get_variant_name
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def save_image(name):
+    output = BytesIO()
+    Image.new('RGB', (800, 600), 'red').save(output, 'JPEG')
+    return default_storage.save(name, ContentFile(output.getvalue()))
+
+
+def get_list_image(client, recipe, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(default_storage, 'exists', lambda name: pytest.fail(
+            'Наличие копий не должно проверяться при запросе'
+        ))
+        response = client.get('/api/recipes/', {'limit': 1})
+    assert response.data['results'][0]['id'] == recipe.id
+    return response.data['results'][0]['image']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_variant_url_is_served_once_variants_are_built(anonymous_client,
+                                                       recipes, monkeypatch):
+    recipe = recipes[-1]
+    name = save_image(recipe.image.name)
+    assert get_list_image(anonymous_client, recipe, monkeypatch).endswith(
+        name
+    )
+
+    build_variants(recipe.id, name)
+    recipe.refresh_from_db()
+    assert recipe.image_variants_for == name
+    assert default_storage.exists(get_variant_name(name, 'thumbnail'))
+    assert get_list_image(anonymous_client, recipe, monkeypatch).endswith(
+        get_variant_name(name, 'thumbnail')
+    )
+
+
+def test_new_image_falls_back_to_original(recipes):
+    recipe = recipes[0]
+    build_variants(recipe.id, save_image(recipe.image.name))
+    recipe.refresh_from_db()
+    recipe.image = 'recipes/images/other.png'
+    recipe.save()
+    recipe = Recipe.objects.get(id=recipe.id)
+    assert recipe.image_variants_for != recipe.image.name
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from api import ingredient_index as module
+from api.ingredient_index import IngredientIndex, match_sql
+from recipes.models import RecipeIngredient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def index(tmp_path):
+    return IngredientIndex(str(tmp_path / 'index'))
+
+
+def as_lists(result):
+    return [values.tolist() for values in result]
+
+
+def assert_matches_database(index, ingredient_ids):
+    recipe_ids, coverage, missing = index.match(ingredient_ids)
+    expected_ids, expected_coverage, expected_missing = match_sql(
+        ingredient_ids
+    )
+    assert recipe_ids.tolist() == expected_ids.tolist()
+    assert coverage.tolist() == pytest.approx(expected_coverage.tolist())
+    assert missing.tolist() == expected_missing.tolist()
+
+
+def test_match_without_index_uses_database(index, ingredients, recipes,
+                                           monkeypatch):
+    submitted = []
+    monkeypatch.setattr(module, 'submit_update',
+                        lambda: submitted.append(True))
+    ingredient_ids = [ingredient.id for ingredient in ingredients[:4]]
+    assert as_lists(index.match(ingredient_ids)) == as_lists(
+        match_sql(ingredient_ids)
+    )
+    assert submitted == [True]
+    assert index.read_pointer() is None
+
+
+def test_update_rewrites_only_delta(index, ingredients, recipes, settings):
+    settings.RECIPE_MATCH_INDEX_DELTA_SHARE = 1
+    first = index.update()
+    changed, deleted = recipes[0], recipes[1]
+    deleted_id = deleted.id
+    RecipeIngredient.objects.filter(recipe=changed).delete()
+    RecipeIngredient.objects.create(
+        recipe=changed, ingredients=ingredients[9], amount=1,
+    )
+    deleted.delete()
+
+    second = index.update(recipe_ids={changed.id, deleted_id})
+    arrays, meta = index.load(second)
+    assert meta['changed'] == 1
+    assert sorted(arrays['stale'].tolist()) == sorted(
+        [changed.id, deleted_id]
+    )
+    for name in module.ARRAYS:
+        assert os.path.samefile(
+            os.path.join(index.path, first, f'{name}.npy'),
+            os.path.join(index.path, second, f'{name}.npy'),
+        )
+    for ingredient_ids in ([ingredient.id for ingredient in ingredients],
+                           [ingredients[0].id, ingredients[9].id]):
+        assert_matches_database(index, ingredient_ids)
+
+
+def test_large_delta_is_merged_into_base(index, ingredients, recipes,
+                                         settings):
+    settings.RECIPE_MATCH_INDEX_DELTA_SHARE = 0
+    index.update()
+    RecipeIngredient.objects.filter(recipe=recipes[0]).delete()
+    generation = index.update(recipe_ids={recipes[0].id})
+    arrays, meta = index.load(generation)
+    assert meta['changed'] == 0
+    assert not len(arrays['stale'])
+    assert recipes[0].id not in arrays['recipe_ids']
+    assert_matches_database(
+        index, [ingredient.id for ingredient in ingredients]
+    )
+
+
+@pytest.mark.parametrize('grace, kept', ((60, 2), (-60, 1)))
+def test_replaced_generation_outlives_grace_period(index, recipes, settings,
+                                                   grace, kept):
+    settings.RECIPE_MATCH_INDEX_GRACE = grace
+    index.update()
+    index.update(full=True)
+    generations = [
+        name for name in os.listdir(index.path)
+        if os.path.isdir(os.path.join(index.path, name))
+    ]
+    assert len(generations) == kept
+    assert index.read_pointer() in generations
+
+
+def test_match_endpoint_works_before_index_is_built(user_client, ingredients,
+                                                    recipes):
+    response = user_client.get(
+        '/api/recipes/match/',
+        {'ingredients': f'{ingredients[0].id},{ingredients[1].id}'},
+    )
+    assert response.status_code == 200
+    assert response.data['count'] == len(match_sql(
+        [ingredients[0].id, ingredients[1].id]
+    )[0])
@@ -0,0 +1,55 @@
+import pytest
+
+from api import instrumentation
+from api.instrumentation import RequestMetrics, RouteHistograms
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    # Два экземпляра гистограмм с разными идентификаторами изображают
+    # два процесса gunicorn с общим кешем.
+    def make_worker(name):
+        histograms = RouteHistograms()
+        flush = histograms.flush
+
+        def flush_as_worker(force=False):
+            with monkeypatch.context() as patch:
+                patch.setattr(instrumentation, 'get_worker', lambda: name)
+                flush(force)
+        histograms.flush = flush_as_worker
+        return histograms
+    return make_worker('web-1:10'), make_worker('web-2:20')
+
+
+def get_count(text, route, worker):
+    line = (f'foodgram_request_duration_seconds_count{{route="{route}",'
+            f'method="GET",worker="{worker}"}}')
+    return [row for row in text.splitlines() if row.startswith(line)]
+
+
+def test_metrics_of_all_workers_are_rendered(workers, settings):
+    settings.API_METRICS_FLUSH_INTERVAL = 0
+    first, second = workers
+    first.observe('api/recipes/', 'GET', 0.02, RequestMetrics())
+    for _ in range(2):
+        second.observe('api/recipes/', 'GET', 0.2, RequestMetrics())
+
+    rendered = first.render()
+    assert get_count(rendered, 'api/recipes/', 'web-1:10') == [
+        'foodgram_request_duration_seconds_count{route="api/recipes/",'
+        'method="GET",worker="web-1:10"} 1'
+    ]
+    assert get_count(rendered, 'api/recipes/', 'web-2:20')[0].endswith(' 2')
+    assert rendered == second.render()
+
+
+def test_flush_is_throttled(workers, settings):
+    settings.API_METRICS_FLUSH_INTERVAL = 60
+    first, second = workers
+    first.observe('api/tags/', 'GET', 0.01, RequestMetrics())
+    first.observe('api/tags/', 'GET', 0.01, RequestMetrics())
+    # Второй замер еще не выложен в кеш: до сброса другие процессы
+    # видят только первый.
+    assert get_count(second.render(), 'api/tags/', 'web-1:10')[0].endswith(
+        ' 1'
+    )
@@ -0,0 +1,24 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+pytestmark = pytest.mark.django_db
+
+
+def test_load_resets_cached_ingredient_list(anonymous_client, ingredients,
+                                            tmp_path):
+    response = anonymous_client.get('/api/ingredients/')
+    etag = response['ETag']
+    assert len(response.data) == len(ingredients)
+    assert anonymous_client.get('/api/ingredients/')['X-Cache'] == 'HIT'
+
+    path = tmp_path / 'ingredients.csv'
+    path.write_text('соль,г\nИнгредиент 00,г\n', encoding='utf-8')
+    call_command('load_ingredients', str(path), stdout=StringIO())
+
+    response = anonymous_client.get('/api/ingredients/',
+                                    HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['X-Cache'] == 'MISS'
+    assert len(response.data) == len(ingredients) + 1
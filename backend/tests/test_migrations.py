@@ -0,0 +1,59 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE = [
+    ('recipes', '0004_ingredient_search_indexes'),
+    ('users', '0001_initial'),
+]
+AFTER = [('recipes', '0005_ingredient_unique')]
+
+
+@pytest.fixture
+def migrate(transactional_db):
+    def migrate(targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+    yield migrate
+    migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+
+def test_ingredient_duplicates_are_merged(migrate):
+    apps = migrate(BEFORE)
+    User = apps.get_model('users', 'User')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    author = User.objects.create(username='author', email='a@example.com')
+    salt, duplicate, other = (
+        Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in ('соль', 'соль', 'сахар')
+    )
+    both, single = (
+        Recipe.objects.create(author=author, name=name, text='Текст',
+                              image='recipes/images/test.png',
+                              cooking_time=10)
+        for name in ('Оба дубля', 'Один дубль')
+    )
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe=both, ingredients=salt, amount=2),
+        RecipeIngredient(recipe=both, ingredients=duplicate, amount=3),
+        RecipeIngredient(recipe=single, ingredients=duplicate, amount=5),
+        RecipeIngredient(recipe=single, ingredients=other, amount=7),
+    ])
+
+    apps = migrate(AFTER)
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    assert set(Ingredient.objects.values_list('id', flat=True)) == {
+        salt.id, other.id,
+    }
+    assert set(RecipeIngredient.objects.values_list(
+        'recipe', 'ingredients', 'amount',
+    )) == {
+        (both.id, salt.id, 5),
+        (single.id, salt.id, 5),
+        (single.id, other.id, 7),
+    }
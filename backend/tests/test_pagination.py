@@ -0,0 +1,87 @@
+import pytest
+
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db
+
+RECIPES_URL = '/api/recipes/'
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+
+
+@pytest.fixture
+def authors(user, make_user):
+    authors = [make_user(f'author-{number}') for number in range(7)]
+    for author in authors:
+        Follow.objects.create(user=user, author=author)
+    return authors
+
+
+def walk(client, url, **params):
+    ids, pages = [], 0
+    params = {'cursor': '', **params}
+    while url:
+        response = client.get(url, params)
+        assert response.status_code == 200
+        ids.extend(item['id'] for item in response.data['results'])
+        url, params = response.data['next'], None
+        pages += 1
+    return ids, pages
+
+
+@pytest.mark.parametrize('url', (RECIPES_URL, SUBSCRIPTIONS_URL))
+def test_cursor_pages_have_no_gaps_or_duplicates(user_client, recipes,
+                                                 authors, url):
+    expected = sorted(
+        (item.id for item in (recipes if url == RECIPES_URL else authors)),
+        reverse=True,
+    )
+    ids, pages = walk(user_client, url, limit=5)
+    assert ids == expected
+    assert pages == -(-len(expected) // 5)
+
+
+@pytest.mark.parametrize('url', (RECIPES_URL, SUBSCRIPTIONS_URL))
+def test_cursor_count_is_opt_in(user_client, recipes, authors, url):
+    total = len(recipes if url == RECIPES_URL else authors)
+    response = user_client.get(url, {'cursor': '', 'limit': 5})
+    assert 'count' not in response.data
+    response = user_client.get(url, {'cursor': '', 'count': 'exact'})
+    assert response.data['count'] == total
+    # Оценка берется из плана запроса и может отличаться от точного
+    # числа, но остается числом.
+    response = user_client.get(url, {'cursor': '', 'count': 'estimate'})
+    assert isinstance(response.data['count'], int)
+    assert response.data['count'] >= 0
+
+
+@pytest.mark.parametrize('url', (RECIPES_URL, SUBSCRIPTIONS_URL))
+def test_page_contract_without_cursor(user_client, recipes, authors, url):
+    total = len(recipes if url == RECIPES_URL else authors)
+    response = user_client.get(url, {'page': 2, 'limit': 3})
+    assert response.status_code == 200
+    assert list(response.data) == ['count', 'next', 'previous', 'results']
+    assert response.data['count'] == total
+    assert len(response.data['results']) == 3
+    assert 'page=3' in response.data['next']
+    assert 'page' not in response.data['previous']
+    first = user_client.get(url, {'limit': 3}).data['results']
+    assert not {item['id'] for item in first} & {
+        item['id'] for item in response.data['results']
+    }
+
+
+def test_cursor_is_stable_when_recipes_are_added(user_client, recipes,
+                                                 author, make_recipes):
+    # Со смещением новый рецепт сдвинул бы страницы и повторил
+    # последний рецепт первой страницы на второй.
+    response = user_client.get(RECIPES_URL, {'cursor': '', 'limit': 5})
+    first = [recipe['id'] for recipe in response.data['results']]
+    make_recipes(author, 1)
+    second = [
+        recipe['id']
+        for recipe in user_client.get(response.data['next']).data['results']
+    ]
+    assert second == sorted(
+        (recipe.id for recipe in recipes), reverse=True,
+    )[5:10]
+    assert not set(first) & set(second)
@@ -0,0 +1,58 @@
+import pytest
+from django.core.cache import caches
+
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db
+
+# Число запросов не зависит от размера страницы: автор выбирается
+# JOIN-ом, теги и ингредиенты подгружаются prefetch-ем, а флаги зрителя —
+# тремя запросами на множества id (кеш перед каждым замером очищен).
+LIMITS = (1, 6, 12)
+
+
+def get(client, url, django_assert_num_queries, queries):
+    caches['default'].clear()
+    with django_assert_num_queries(queries):
+        response = client.get(url)
+    assert response.status_code == 200, response.content
+    return response
+
+
+@pytest.mark.parametrize('limit', LIMITS)
+def test_recipe_list_anonymous(anonymous_client, recipes, limit,
+                               django_assert_num_queries):
+    response = get(anonymous_client, f'/api/recipes/?limit={limit}',
+                   django_assert_num_queries, 4)
+    assert len(response.data['results']) == limit
+
+
+@pytest.mark.parametrize('limit', LIMITS)
+def test_recipe_list_authenticated(user_client, recipes, limit,
+                                   django_assert_num_queries):
+    response = get(user_client, f'/api/recipes/?limit={limit}',
+                   django_assert_num_queries, 7)
+    assert len(response.data['results']) == limit
+
+
+def test_recipe_retrieve(user_client, recipes, django_assert_num_queries):
+    get(user_client, f'/api/recipes/{recipes[0].id}/',
+        django_assert_num_queries, 6)
+
+
+@pytest.mark.parametrize('limit', LIMITS)
+def test_subscriptions(user, user_client, make_user, make_recipes, limit,
+                       django_assert_num_queries):
+    for number in range(12):
+        author = make_user(f'author-{number}')
+        make_recipes(author, 4)
+        Follow.objects.create(user=user, author=author)
+    response = get(
+        user_client,
+        f'/api/users/subscriptions/?limit={limit}&recipes_limit=3',
+        django_assert_num_queries, 5,
+    )
+    assert len(response.data['results']) == limit
+    assert all(
+        len(author['recipes']) == 3 for author in response.data['results']
+    )
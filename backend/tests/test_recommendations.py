@@ -0,0 +1,49 @@
+import pytest
+
+from recipes import recommendations
+from recipes.models import Favorite, RecipeNeighbour
+
+pytestmark = pytest.mark.django_db
+
+
+def get_neighbours():
+    rows = RecipeNeighbour.objects.values_list(
+        'recipe_id', 'neighbour_id', 'score',
+    )
+    return {
+        (recipe_id, neighbour_id): pytest.approx(score)
+        for recipe_id, neighbour_id, score in rows
+    }
+
+
+@pytest.fixture
+def favorites(user, author, make_recipes):
+    recipes = make_recipes(author, 30)
+    Favorite.objects.bulk_create(
+        Favorite(user=follower, recipe=recipe)
+        for follower in (user, author) for recipe in recipes[1:]
+    )
+    return recipes
+
+
+def test_build_replaces_neighbours_by_chunks(favorites, settings):
+    settings.RECIPE_NEIGHBOURS = 20
+    lonely = favorites[0]
+    RecipeNeighbour.objects.create(recipe=lonely, neighbour=favorites[1],
+                                   score=1)
+    # Больше 500 строк: одной вставкой SQLite бы их не принял.
+    assert recommendations.build(chunk_size=1000) == (29, 29 * 20)
+    expected = get_neighbours()
+    assert not RecipeNeighbour.objects.filter(recipe=lonely).exists()
+
+    RecipeNeighbour.objects.create(recipe=lonely, neighbour=favorites[1],
+                                   score=1)
+    assert recommendations.build(chunk_size=7) == (29, 29 * 20)
+    assert get_neighbours() == expected
+
+
+def test_build_without_interactions_clears_neighbours(recipes):
+    RecipeNeighbour.objects.create(recipe=recipes[0], neighbour=recipes[1],
+                                   score=1)
+    assert recommendations.build() == (0, 0)
+    assert not RecipeNeighbour.objects.exists()
@@ -0,0 +1,42 @@
+import pytest
+from django.core.cache import caches
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from api.connections import PRIMARY_COOKIE, can_read_replica
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.DB_REPLICAS = ['default']
+
+
+def make_request(user, cookies=None):
+    request = Request(RequestFactory().get('/api/recipes/'))
+    request.COOKIES.update(cookies or {})
+    request.user = user
+    return request
+
+
+def test_write_pins_reads_to_primary_without_shared_cache(
+    user, user_client, recipes,
+):
+    assert can_read_replica(make_request(user))
+    response = user_client.post(f'/api/recipes/{recipes[0].id}/favorite/')
+    cookie = response.cookies[PRIMARY_COOKIE].value
+    # Следующий запрос может попасть в процесс с другим кешем.
+    caches['default'].clear()
+    assert not can_read_replica(make_request(user, {PRIMARY_COOKIE: cookie}))
+    assert can_read_replica(make_request(user))
+
+
+def test_cookie_is_bound_to_user(user, author, user_client, recipes):
+    response = user_client.post(f'/api/recipes/{recipes[0].id}/favorite/')
+    cookie = response.cookies[PRIMARY_COOKIE].value
+    caches['default'].clear()
+    assert can_read_replica(make_request(author, {PRIMARY_COOKIE: cookie}))
+    assert can_read_replica(
+        make_request(user, {PRIMARY_COOKIE: f'{user.id}:forged'})
+    )
@@ -0,0 +1,74 @@
+import pytest
+from django.db import connection
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Полнотекстовый поиск есть только на PostgreSQL',
+    ),
+]
+
+
+def make_recipe(author, name, text='Text'):
+    return Recipe.objects.create(author=author, name=name, text=text,
+                                 image='recipes/images/test.png',
+                                 cooking_time=10)
+
+
+def get_vector(recipe):
+    return Recipe.objects.extra(
+        select={'vector': 'search_vector::text'},
+    ).values_list('vector', flat=True).get(id=recipe.id)
+
+
+def test_link_triggers_run_once_per_statement():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT DISTINCT action_orientation FROM "
+            "information_schema.triggers WHERE event_object_table IN "
+            "('recipes_recipeingredient', 'recipes_ingredient')"
+        )
+        assert cursor.fetchall() == [('STATEMENT',)]
+
+
+def test_vector_follows_links_and_ingredient_names(author, ingredients):
+    # Слова латиницей: в кластере с кодировкой SQL_ASCII кириллица
+    # не разбирается на лексемы.
+    Ingredient.objects.filter(id=ingredients[0].id).update(name='Beet')
+    recipe = make_recipe(author, 'Soup')
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredients=ingredient, amount=1)
+        for ingredient in ingredients[:2]
+    )
+    assert "'beet'" in get_vector(recipe)
+
+    Ingredient.objects.filter(id=ingredients[0].id).update(name='Carrot')
+    assert "'carrot'" in get_vector(recipe)
+
+    RecipeIngredient.objects.filter(recipe=recipe).delete()
+    assert get_vector(recipe) == "'soup':1A 'text':2C"
+
+
+def test_cursor_pages_keep_rank_order(anonymous_client, author):
+    # Совпадение в названии весит больше, чем в описании, хотя эти
+    # рецепты созданы раньше и при сортировке по '-id' шли бы последними.
+    in_name = [make_recipe(author, f'Borscht {number}') for number in range(3)]
+    in_text = [
+        make_recipe(author, f'Soup {number}', text='Almost borscht')
+        for number in range(3)
+    ]
+    make_recipe(author, 'Porridge')
+    found = []
+    url, params = '/api/recipes/', {'search': 'borscht', 'limit': 2,
+                                    'cursor': ''}
+    while url:
+        response = anonymous_client.get(url, params)
+        assert response.status_code == 200
+        found.extend(recipe['id'] for recipe in response.data['results'])
+        url, params = response.data['next'], None
+    assert found == [
+        recipe.id for recipe in in_name[::-1] + in_text[::-1]
+    ]
@@ -0,0 +1,105 @@
+import json
+import os
+
+import pytest
+from django.conf import settings
+
+from api.renderers import (SHOPPING_LIST_RENDERERS, ShoppingListPDFRenderer,
+                           ShoppingListRenderer)
+from api.serializers import RecipeCreateSerializer
+from recipes import shopping_list
+from recipes.models import RecipeIngredient
+
+pytestmark = pytest.mark.django_db
+
+
+def test_renderer_without_stream_cannot_be_created():
+    class ShoppingListXMLRenderer(ShoppingListRenderer):
+        media_type = 'application/xml'
+        format = 'xml'
+
+    with pytest.raises(TypeError):
+        ShoppingListXMLRenderer()
+
+
+@pytest.mark.parametrize('renderer_class', [
+    renderer_class for renderer_class in SHOPPING_LIST_RENDERERS
+    if renderer_class.format != 'pdf'
+])
+def test_download_shopping_cart(user_client, recipes, renderer_class):
+    assert user_client.post(
+        f'/api/recipes/{recipes[0].id}/shopping_cart/'
+    ).status_code == 201
+    response = user_client.get('/api/recipes/download_shopping_cart/',
+                               {'format': renderer_class.format})
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith(renderer_class.media_type)
+    assert response['Content-Disposition'] == (
+        f'attachment; filename="products.{renderer_class.format}"'
+    )
+    content = b''.join(response.streaming_content).decode()
+    assert 'Ингредиент 00' in content
+    if renderer_class.format == 'json':
+        assert len(json.loads(content)) == 3
+
+
+@pytest.mark.skipif(not os.path.exists(settings.SHOPPING_LIST_PDF_FONT),
+                    reason='Нет шрифта для PDF')
+def test_pdf_is_streamed_in_chunks(monkeypatch):
+    monkeypatch.setattr(ShoppingListPDFRenderer, 'chunk_size', 4096)
+    rows = (
+        {'ingredient__name': f'Ингредиент {number}',
+         'ingredient__measurement_unit': f'ед{number // 100}',
+         'amount': number}
+        for number in range(2000)
+    )
+    chunks = list(ShoppingListPDFRenderer().stream(rows))
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 4096 for chunk in chunks)
+    content = b''.join(chunks)
+    assert content.startswith(b'%PDF') and b'%%EOF' in content[-32:]
+
+
+def get_shopping_list(client):
+    response = client.get('/api/recipes/shopping_list/')
+    assert response.status_code == 200
+    return {item['id']: item['amount'] for item in response.data}
+
+
+def test_shopping_list_follows_cart_and_recipe_changes(
+    user, user_client, recipes, ingredients, tags,
+):
+    assert user_client.post(
+        f'/api/recipes/{recipes[0].id}/shopping_cart/'
+    ).status_code == 201
+    assert user_client.post('/api/recipes/shopping_cart/', {
+        'recipes': [recipe.id for recipe in recipes[1:4]],
+    }, format='json').status_code == 200
+    assert user_client.delete(
+        f'/api/recipes/{recipes[1].id}/shopping_cart/'
+    ).status_code == 204
+    RecipeCreateSerializer().update(recipes[0], {
+        'ingredients_recipe': [
+            {'ingredients': {'id': ingredients[0].id}, 'amount': 5},
+            {'ingredients': {'id': ingredients[3].id}, 'amount': 4},
+        ],
+        'tags': tags,
+    })
+    recipes[2].delete()
+
+    assert not shopping_list.check()
+    assert get_shopping_list(user_client) == {
+        ingredients[0].id: 5,
+        ingredients[3].id: 4 + 1,
+        ingredients[4].id: 2,
+        ingredients[5].id: 3,
+    }
+
+
+def test_zero_amounts_are_not_reported_as_drift(user_client, recipes):
+    RecipeIngredient.objects.filter(recipe=recipes[0]).update(amount=0)
+    for recipe in recipes[:2]:
+        user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    user_client.delete(f'/api/recipes/{recipes[1].id}/shopping_cart/')
+    assert get_shopping_list(user_client) == {}
+    assert not shopping_list.check()
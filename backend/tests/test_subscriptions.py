@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def followed(user, make_user, make_recipes):
+    authors = []
+    for number in range(3):
+        author = make_user(f'author-{number}')
+        make_recipes(author, 4 + number)
+        Follow.objects.create(user=user, author=author)
+        authors.append(author)
+    return authors
+
+
+@pytest.mark.parametrize('recipes_limit', (0, 2, 10))
+def test_recipes_limit_keeps_first_recipes_of_each_author(user_client,
+                                                          followed,
+                                                          recipes_limit):
+    response = user_client.get(
+        '/api/users/subscriptions/', {'recipes_limit': recipes_limit},
+    )
+    assert response.status_code == 200
+    for author in response.data['results']:
+        expected = [
+            recipe.id for recipe in sorted(
+                author_recipes(followed, author['id']),
+                key=lambda recipe: (recipe.name, recipe.id),
+            )
+        ][:recipes_limit]
+        assert [recipe['id'] for recipe in author['recipes']] == expected
+
+
+def author_recipes(authors, author_id):
+    author = next(author for author in authors if author.id == author_id)
+    return author.recipes.all()
+
+
+@pytest.mark.parametrize('recipes_limit', ('²', '-1', 'abc'))
+def test_invalid_recipes_limit_is_rejected(user_client, followed,
+                                           recipes_limit):
+    response = user_client.get(
+        '/api/users/subscriptions/', {'recipes_limit': recipes_limit},
+    )
+    assert response.status_code == 400
+    assert 'recipes_limit' in response.data
+
+
+def test_only_authors_of_the_page_are_ranked(user_client, followed):
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.get(
+            '/api/users/subscriptions/', {'limit': 2, 'recipes_limit': 2},
+        )
+    page_ids = [author['id'] for author in response.data['results']]
+    assert len(page_ids) == 2
+    ranking = [
+        query['sql'] for query in context.captured_queries
+        if 'ROW_NUMBER' in query['sql']
+    ]
+    assert len(ranking) == 1
+    # Ограничение по авторам страницы должно стоять внутри нумерации,
+    # а не только во внешнем запросе предвыборки.
+    subquery = ranking[0].split(' FROM (', 1)[1].split(') ranked', 1)[0]
+    assert f'IN ({page_ids[0]}, {page_ids[1]})' in subquery
@@ -0,0 +1,51 @@
+import pytest
+
+# Инвалидация идет в transaction.on_commit, поэтому тестам нужны
+# настоящие коммиты.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_etag_and_flags_follow_favorite(user_client, recipes):
+    url = f'/api/recipes/{recipes[0].id}/'
+    response = user_client.get(url)
+    etag = response['ETag']
+    assert response.data['is_favorited'] is False
+    assert user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    user_client.post(f'{url}favorite/')
+
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.data['is_favorited'] is True
+
+
+def test_subscription_flag_follows_subscribe(user_client, author):
+    url = f'/api/users/{author.id}/'
+    assert user_client.get(url).data['is_subscribed'] is False
+    user_client.post(f'{url}subscribe/')
+    assert user_client.get(url).data['is_subscribed'] is True
+    user_client.delete(f'{url}subscribe/')
+    assert user_client.get(url).data['is_subscribed'] is False
+
+
+def test_state_read_before_invalidation_is_not_served(user, recipes,
+                                                      monkeypatch):
+    from api import user_state
+    from recipes.models import Favorite
+
+    cache = user_state.get_cache()
+
+    class RacingCache:
+        # Избранное меняется между чтением из базы и записью в кеш.
+        def __getattr__(self, name):
+            return getattr(cache, name)
+
+        def set(self, *args, **kwargs):
+            Favorite.objects.create(user=user, recipe=recipes[0])
+            cache.set(*args, **kwargs)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(user_state, 'get_cache', RacingCache)
+        assert user_state.UserState(user).favorites == frozenset()
+    assert user_state.UserState(user).favorites == {recipes[0].id}
@@ -0,0 +1,44 @@
+from django.db import connection
+
+from .models import Follow, User
+
+# Подписка и отписка выполняются одним запросом с RETURNING, поэтому
+# сигналы Follow не срабатывают и счетчик подписчиков меняется здесь.
+
+
+def change_followers_count(author, delta):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {User._meta.db_table} '
+            f'SET followers_count = followers_count + %s '
+            f'WHERE id = %s RETURNING followers_count',
+            [delta, author.pk],
+        )
+        author.followers_count = cursor.fetchone()[0]
+
+
+def follow(user, author):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {Follow._meta.db_table} (user_id, author_id) '
+            f'VALUES (%s, %s) ON CONFLICT (user_id, author_id) DO NOTHING '
+            f'RETURNING id',
+            [user.pk, author.pk],
+        )
+        created = cursor.fetchone() is not None
+    if created:
+        change_followers_count(author, 1)
+    return created
+
+
+def unfollow(user, author):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {Follow._meta.db_table} '
+            f'WHERE user_id = %s AND author_id = %s RETURNING id',
+            [user.pk, author.pk],
+        )
+        deleted = cursor.fetchone() is not None
+    if deleted:
+        change_followers_count(author, -1)
+    return deleted
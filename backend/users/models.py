@@ -1,14 +1,32 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from foodgram.mixins import CounterFieldsMixin
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
     email = models.EmailField(null=False, unique=True, verbose_name='email')
     about = models.TextField(
         max_length=255,
         blank=True,
         verbose_name="О себе"
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено',
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     class Meta:
         ordering = ('username',)
@@ -38,6 +56,12 @@ class Follow(models.Model):
                 check=~models.Q(user=models.F("author")),
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user}: {self.author}'